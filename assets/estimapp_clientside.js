@@ -0,0 +1,32 @@
+// Clientside callbacks of EStiMapp: display-only updates that do not need the server.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    estimapp: {
+        // Show the uploaded file name(s)
+        display_filename: function(filename) {
+            if (!filename || filename.length === 0) {
+                return "";
+            }
+            return "Selected: " + (Array.isArray(filename) ? filename.join(", ") : filename);
+        },
+
+        // Show the electrode label and coordinates of the hovered point in the 3D view
+        display_hover_coordinates: function(hoverData) {
+            if (!hoverData || !hoverData.points) {
+                return "";
+            }
+            const point = hoverData.points[0];
+            const customdata = point.customdata;
+            let electrode_label = "N/A";
+            if (customdata && customdata.length > 0) {
+                electrode_label = Array.isArray(customdata) ? customdata.join(", ") : customdata;
+            }
+            const div = function(text) {
+                return {namespace: "dash_html_components", type: "Div", props: {children: text}};
+            };
+            return [
+                div("Electrode: " + electrode_label),
+                div("x: " + point.x.toFixed(2) + ", y: " + point.y.toFixed(2) + ", z: " + point.z.toFixed(2))
+            ];
+        }
+    }
+});
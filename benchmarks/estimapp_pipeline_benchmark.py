@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17, 2026
+
+@author: iheijink
+
+This script times every stage of the EStiMapp pipeline separately on synthetic data
+(benchmarks/estimapp_synthetic_data.py) and appends the results to a history file (JSON lines),
+so regressions show up when the benchmark is repeated after a change.
+
+Run from the repository folder:
+    python -m benchmarks.estimapp_pipeline_benchmark --rows 1000 100000 1000000
+
+Input:
+    rows: the numbers of annotations, one benchmark per number. Default = 1000 10000 100000
+
+    pair-density, electrodes, contacts, faces, seed: parameters of the synthetic data
+
+    repeat: the number of runs per stage. Default = 3
+
+    history: the history file. Default = benchmarks/results/estimapp_benchmark_history.jsonl
+
+    max-slowdown: fail if a stage is this many times slower than the last run with the same
+        parameters in the history. Default = None (only report)
+
+Output:
+    The median and minimum time per stage are printed and appended to the history, together with
+    the commit, python version, platform, parameters and data sizes. The exit code is 1 if a stage
+    is slower than max-slowdown times the previous run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.estimapp_synthetic_data import estimapp_synthetic_annotations, estimapp_synthetic_scheme, \
+    estimapp_synthetic_coordinates, estimapp_synthetic_mesh
+from functions.estimapp_read_inputs import estimapp_read_ply
+from functions.estimapp_process_annotations import estimapp_process_annotations
+from functions.estimapp_classify_annotations import estimapp_classify_annotations
+from functions.estimapp_define_stimulation_period import estimapp_define_stimulation_period
+from functions.estimapp_localize_annotated_categories import estimapp_localize_annotated_categories
+from functions.estimapp_create_stimulations_overview import estimapp_create_stimulations_overview
+from functions.estimapp_generate_table import estimapp_generate_table
+from functions.estimapp_generate_plot import estimapp_generate_plot
+from functions.estimapp_interpolate_electrodes import estimapp_interpolate_electrodes
+from functions.estimapp_generate_3d_plot import estimapp_generate_3d_plot
+
+RepoPath = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+default_history = os.path.join(RepoPath, "benchmarks", "results", "estimapp_benchmark_history.jsonl")
+
+def time_stage(stage, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        durations.append(time.perf_counter() - start)
+    return {"median": statistics.median(durations), "min": min(durations)}
+
+def overview_inputs(annotations_df):
+    # The input of estimapp_create_stimulations_overview, as prepared by estimapp_process_annotations
+    labelled = estimapp_define_stimulation_period(estimapp_classify_annotations(annotations_df))
+    filtered = labelled[labelled["StimPeriod"] >= 0].reset_index(drop=True)
+    stimPeriod = filtered[filtered["AnnotationType"] == "stim marker"]
+    annotated_categories = estimapp_localize_annotated_categories(filtered)
+    return filtered, annotated_categories, stimPeriod
+
+def run_benchmark(n_rows, args):
+    annotations_df = estimapp_synthetic_annotations(n_rows, pair_density=args.pair_density, n_electrodes=args.electrodes,
+                                                    n_contacts=args.contacts, seed=args.seed)
+    electrodes_df = estimapp_synthetic_scheme(args.electrodes, args.contacts)
+    coordinates_df = estimapp_synthetic_coordinates(args.electrodes, args.contacts, seed=args.seed)
+    mesh = estimapp_read_ply(estimapp_synthetic_mesh(args.faces))
+
+    stimulations_df, filtered_stimulations_df, categories = estimapp_process_annotations(annotations_df)
+    filtered, annotated_categories, stimPeriod = overview_inputs(annotations_df)
+
+    stages = {
+        "estimapp_process_annotations": lambda: estimapp_process_annotations(annotations_df),
+        "estimapp_create_stimulations_overview": lambda: estimapp_create_stimulations_overview(filtered, annotated_categories, stimPeriod, "Comment"),
+        "estimapp_generate_table": lambda: estimapp_generate_table(filtered_stimulations_df),
+        "estimapp_generate_plot": lambda: estimapp_generate_plot(electrodes_df, filtered_stimulations_df),
+        "estimapp_interpolate_electrodes": lambda: estimapp_interpolate_electrodes(coordinates_df),
+        "estimapp_generate_3d_plot": lambda: estimapp_generate_3d_plot(mesh, coordinates_df, filtered_stimulations_df),
+    }
+    sizes = {"annotations": len(annotations_df), "stimulations": len(stimulations_df), "filtered_stimulations": len(filtered_stimulations_df),
+             "contacts": args.electrodes * args.contacts, "faces": len(mesh.faces)}
+    return sizes, {stage: time_stage(run, args.repeat) for stage, run in stages.items()}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RepoPath, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def read_history(history):
+    if not os.path.exists(history):
+        return []
+    with open(history) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every stage of the EStiMapp pipeline on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000], help="numbers of annotations (default: 1000 10000 100000)")
+    parser.add_argument("--pair-density", type=float, default=0.3, help="fraction of annotations that is a stimulation pair (default: 0.3)")
+    parser.add_argument("--electrodes", type=int, default=8, help="number of electrodes (default: 8)")
+    parser.add_argument("--contacts", type=int, default=10, help="number of contacts per electrode (default: 10)")
+    parser.add_argument("--faces", type=int, default=100000, help="minimum number of faces of the brain rendering (default: 100000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per stage (default: 3)")
+    parser.add_argument("--history", default=default_history, help="history file (JSON lines)")
+    parser.add_argument("--max-slowdown", type=float, default=None, help="fail if a stage is this many times slower than the previous run")
+    args = parser.parse_args(argv)
+
+    history = read_history(args.history)
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    commit = git_commit()
+
+    failed = []
+    for n_rows in args.rows:
+        parameters = {"rows": n_rows, "pair_density": args.pair_density, "electrodes": args.electrodes,
+                      "contacts": args.contacts, "faces": args.faces, "seed": args.seed}
+        sizes, stages = run_benchmark(n_rows, args)
+        record = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": commit,
+                  "python": platform.python_version(), "platform": platform.platform(), "repeat": args.repeat,
+                  "parameters": parameters, "sizes": sizes, "stages": stages}
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+        # Compare with the last run with the same parameters
+        previous = next((old for old in reversed(history) if old["parameters"] == parameters), None)
+        print(f"\n{n_rows} annotations ({sizes['stimulations']} stimulations, {sizes['faces']} faces)")
+        for stage, timing in stages.items():
+            line = f"  {stage:<40} median {timing['median']:.4f} s  min {timing['min']:.4f} s"
+            if previous and stage in previous["stages"]:
+                slowdown = timing["median"] / previous["stages"][stage]["median"]
+                line += f"  {slowdown:.2f}x previous ({previous['commit']})"
+                if args.max_slowdown is not None and slowdown > args.max_slowdown:
+                    failed.append(f"{stage} with {n_rows} annotations is {slowdown:.2f}x slower than {previous['commit']}")
+            print(line)
+        history.append(record)
+
+    print("\nHistory saved in", args.history)
+    for failure in failed:
+        print("FAILED:", failure)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17, 2026
+
+@author: iheijink
+
+This script measures the cold-start time of EStiMapp: the time to import the app (worker start)
+and the batch processing (CLI start) in a new python process. The heavy packages of the 2D and
+3D visualization (e.g. trimesh) are only imported when they are needed, so they should not be
+imported at start.
+
+Run from the repository folder:
+    python benchmarks/estimapp_startup_benchmark.py --budget 3.0 --repeat 5
+
+Input:
+    budget: the maximum median import time in seconds per module. Default = environment variable
+        ESTIMAPP_STARTUP_BUDGET or 3.0
+
+    repeat: the number of new processes per module. Default = 5
+
+Output:
+    The median and minimum import time per module are printed. The exit code is 1 if a module
+    is slower than the budget or imports a deferred package at start.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RepoPath = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+
+modules = ["estimapp", "estimapp_batch"]
+deferred_packages = ["trimesh", "matplotlib", "plotly.express"] # must not be imported at start
+
+measure_import = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{"duration": duration, "deferred": [name for name in {deferred} if name in sys.modules]}}))
+"""
+
+def measure_startup(module):
+    # A new process per measurement, so nothing is imported yet
+    code = measure_import.format(module=module, deferred=deferred_packages)
+    output = subprocess.run([sys.executable, "-c", code], cwd=RepoPath, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1]) # last line, the app may print while importing
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold-start import time of EStiMapp.")
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("ESTIMAPP_STARTUP_BUDGET", 3.0)),
+                        help="maximum median import time in seconds (default: ESTIMAPP_STARTUP_BUDGET or 3.0)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of new processes per module (default: 5)")
+    args = parser.parse_args(argv)
+
+    failed = []
+    for module in modules:
+        measurements = [measure_startup(module) for _ in range(args.repeat)]
+        durations = [measurement["duration"] for measurement in measurements]
+        deferred = sorted(set(name for measurement in measurements for name in measurement["deferred"]))
+        median = statistics.median(durations)
+        print(f"{module}: median {median:.3f} s, min {min(durations):.3f} s (budget {args.budget:.3f} s)")
+
+        if median > args.budget:
+            failed.append(f"{module} import time {median:.3f} s exceeds the budget of {args.budget:.3f} s")
+        if deferred:
+            failed.append(f"{module} imports {', '.join(deferred)} at start")
+
+    for failure in failed:
+        print("FAILED:", failure)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17, 2026
+
+@author: iheijink
+
+These functions generate synthetic input data of EStiMapp for the benchmarks. All generators
+are seeded, so the same parameters always give the same data.
+
+Input:
+    n_rows: the number of annotations (rows of the Micromed-style annotations export)
+
+    pair_density: the fraction of annotations that is a stimulation pair. Default = 0.3
+
+    category_mix: a dictionary with the relative frequency of every category abbreviation.
+        Default = None, all categories of the category registry are equally frequent
+
+    n_electrodes: the number of electrodes. Default = 8
+
+    n_contacts: the number of contacts per electrode. Default = 10
+
+    period_length: the number of annotations per stimulation period (Stim_on; to Stim_off;). Default = 40.
+        The last period is closed with Stim_off; if n_rows is not a multiple of period_length
+
+    n_faces: the minimum number of faces of the brain rendering. Default = 100000
+
+    seed: the seed of the random generator. Default = 0
+
+Output:
+    estimapp_synthetic_annotations: a dataframe with the annotations (columns of the annotations export)
+
+    estimapp_synthetic_scheme: a dataframe with the electrode scheme as read from the electrodes overview
+        (one electrode per row, empty cells are '')
+
+    estimapp_synthetic_coordinates: a dataframe with the electrode coordinates as read from the coordinates sheet
+
+    estimapp_synthetic_mesh: the bytes of a PLY file with a spherical brain rendering
+"""
+import numpy as np
+import pandas as pd
+
+from functions.estimapp_category_registry import categories_abbreviations
+
+stim_types = np.array(["SPES", "50Hz", "1Hz"], dtype=object)
+
+def estimapp_synthetic_electrode_names(n_electrodes):
+    # AA, AB, ..., ZZ
+    return np.array([chr(65 + i // 26 % 26) + chr(65 + i % 26) for i in range(n_electrodes)], dtype=object)
+
+def estimapp_synthetic_annotations(n_rows, pair_density=0.3, category_mix=None, n_electrodes=8, n_contacts=10,
+                                   period_length=40, seed=0):
+    rng = np.random.default_rng(seed)
+    category_mix = category_mix or {abbr: 1 for abbr in categories_abbreviations}
+    abbreviations = np.array(list(category_mix), dtype=object)
+    category_weights = np.array(list(category_mix.values()), dtype=float)
+
+    # Stimulation pairs, categories, free text and "nothing" between the stim markers
+    other = 1 - pair_density
+    kind = rng.choice(4, size=n_rows, p=[pair_density, 0.6 * other, 0.25 * other, 0.15 * other])
+    names = estimapp_synthetic_electrode_names(n_electrodes)[rng.integers(n_electrodes, size=n_rows)]
+    contacts = rng.integers(1, n_contacts, size=n_rows)
+    pairs = names + contacts.astype(str).astype(object) + "-" + names + (contacts + 1).astype(str).astype(object) + \
+        " " + rng.integers(1, 6, size=n_rows).astype(str).astype(object) + "mA"
+    categories = rng.choice(abbreviations, size=n_rows, p=category_weights / category_weights.sum())
+    free_text = "free text " + rng.integers(100, size=n_rows).astype(str).astype(object)
+    comments = np.select([kind == 0, kind == 1, kind == 2], [pairs, categories, free_text], default="nothing").astype(object)
+
+    position = np.arange(n_rows) % period_length
+    comments[position == 0] = "Stim_on;" + rng.choice(stim_types, size=np.count_nonzero(position == 0))
+    comments[position == period_length - 2] = "Stim_off;"
+    comments[position == period_length - 1] = "between periods"
+    if n_rows % period_length not in (0, period_length - 1): # close the last, incomplete stimulation period
+        comments[-1] = "Stim_off;" if n_rows % period_length > 1 else "between periods"
+
+    start = np.arange(n_rows) * 2.0
+    return pd.DataFrame({"Start from:": start, "Time End": start + 1, "Duration": 1.0, "Category": "", "Comment": comments})
+
+def estimapp_synthetic_scheme(n_electrodes=8, n_contacts=10):
+    # Every electrode on its own row, with an empty row and column around the electrodes
+    grid = np.full((2 * n_electrodes + 1, n_contacts + 2), "", dtype=object)
+    for i, name in enumerate(estimapp_synthetic_electrode_names(n_electrodes)):
+        grid[2 * i + 1, 1:n_contacts + 1] = [f"{name}{contact}" for contact in range(1, n_contacts + 1)]
+    return pd.DataFrame(grid)
+
+def estimapp_synthetic_coordinates(n_electrodes=8, n_contacts=10, seed=0):
+    rng = np.random.default_rng(seed)
+    target = rng.uniform(-40, 40, size=(n_electrodes, 3))
+    direction = rng.normal(size=(n_electrodes, 3))
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+    entry = target + direction * 3.5 * n_contacts
+    return pd.DataFrame({"electrode_name": estimapp_synthetic_electrode_names(n_electrodes), "nr_of_channels": n_contacts,
+                         "entry_x": entry[:, 0], "entry_y": entry[:, 1], "entry_z": entry[:, 2],
+                         "target_x": target[:, 0], "target_y": target[:, 1], "target_z": target[:, 2]})
+
+def estimapp_synthetic_mesh(n_faces=100000):
+    import trimesh
+    # An icosphere has 20 * 4**subdivisions faces
+    subdivisions = max(0, int(np.ceil(np.log(n_faces / 20) / np.log(4))))
+    mesh = trimesh.creation.icosphere(subdivisions=subdivisions, radius=80)
+    return mesh.export(file_type="ply")
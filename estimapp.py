@@ -2,7 +2,10 @@
 Created on Mon May 26, 2025
 @author: Irene Heijink
 
-Run this dash app to host the webpage at localhost:8050/
+Run this dash app to host the webpage at localhost:8050/ (set ESTIMAPP_DEBUG=1 for debug mode).
+For a production server use the WSGI server of the app, e.g. gunicorn --workers 4 estimapp:server,
+the sessions are shared between the workers in ESTIMAPP_CACHE_DIR (default: a folder in the temporary folder).
+The timing of every processing stage is served at localhost:8050/metrics (set ESTIMAPP_LOG_LEVEL=INFO to log it).
 
 The app visualises the result of electrical stimulation during intracranial monitoring.
 
@@ -35,23 +38,32 @@ Output:
         change the opacity.
 """
 
+import os
+import logging
 import dash
-from dash import html, dcc, Input, Output, State, dash_table
+from dash import html, dcc, Input, Output, State, Patch, ClientsideFunction, dash_table
 import dash_mantine_components as dmc
-import base64
-import io
 import pandas as pd
-import trimesh
-import csv
 
+from functions.estimapp_read_inputs import estimapp_read_excel, estimapp_read_annotation_files, estimapp_read_ply
 from functions.estimapp_process_annotations import estimapp_process_annotations
 from functions.estimapp_generate_plot import estimapp_generate_plot
 from functions.estimapp_generate_table import estimapp_generate_table
 from functions.estimapp_generate_3d_plot import estimapp_generate_3d_plot
+from functions.estimapp_decimate_mesh import estimapp_decimate_mesh
 from functions.estimapp_create_upload_button import estimapp_create_upload_button
+from functions.estimapp_session_cache import session_cache, estimapp_create_background_manager
+from functions.estimapp_electrode_registry import estimapp_build_electrode_registry
+from functions.estimapp_upload_store import estimapp_store_uploads, estimapp_has_uploads, estimapp_load_uploads
+from functions.estimapp_instrumentation import estimapp_stage, estimapp_request, estimapp_register_metrics
+
+logger = logging.getLogger(__name__)
 
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
 app.title = "EStiMapp"
+server = app.server # WSGI entry point for production servers
+estimapp_register_metrics(server) # stage timings at localhost:8050/metrics
+background_callback_manager = estimapp_create_background_manager() # None without dash[diskcache]
   
 # Layouts
 app.layout = dmc.MantineProvider(
@@ -98,7 +110,6 @@ def layout_home():
         ], align="center", gap="sm"),size="sm")
 
 def layout_result():
-    print("layout_result is called")
     return html.Div([
         html.H3("Result Page", style={'font-family':'verdana'}),
         html.H4(id="result-name", style={'font-family':'verdana'}),
@@ -109,116 +120,113 @@ def layout_result():
             dcc.Tab(label="3D visualization", value="tab-3d", 
                     style={'background':'white', 'color': 'black', 'font-family': 'verdana'},
                     selected_style={'background':'blue', 'color':'white', 'font-family':'verdana'})]),
+        html.Div(id="result-progress", style={'font-family':'verdana', 'display':'none'}),
         html.Div(id="result-tab-content"),
         html.Br(),
+        dcc.Store(id="result-ready"),
         dcc.Store(id="processed-annotations"),
         dcc.Store(id="edited-processed-annotations"),
         html.Div(id="result-table") # table is outside tab
     ])
 
-# Show uploaded file names
-@app.callback(
-    Output("upload-overview-electrodes", "children"),
-    Input("upload-electrodes", "filename")
-)
-def update_electrodes(filename):
-    return f"Selected: {filename}" if filename else ""
-
-@app.callback(
-    Output("upload-overview-annotations", "children"),
-    Input("upload-annotations", "filename")
-)
-def update_annotations(filenames):
-    if filenames:
-        return "Selected: " + ", ".join(filenames)
-    return ""
-
-@app.callback(
-    Output("upload-electrode-coordinates", "children"),
-    Input("upload-coordinates", "filename")
-)
-def update_coordinates(filename):
-    if filename:
-        return f"Selected: {filename}" if filename else ""
-    return ""
-
-@app.callback(
-    Output("upload-ply-rendering", "children"),
-    Input("upload-ply", "filename")
-)
-def update_ply(filename):
-    if filename:
-        return f"Selected: {filename}" if filename else ""
-    return ""
+# Show uploaded file names, clientside (assets/estimapp_clientside.js)
+for upload_id, overview_id in [("upload-electrodes", "upload-overview-electrodes"), ("upload-annotations", "upload-overview-annotations"),
+                               ("upload-coordinates", "upload-electrode-coordinates"), ("upload-ply", "upload-ply-rendering")]:
+    app.clientside_callback(
+        ClientsideFunction(namespace="estimapp", function_name="display_filename"),
+        Output(overview_id, "children"),
+        Input(upload_id, "filename")
+    )
     
 # Result page
-def show_result(data):
-    print("⚡ show_result called")
+def show_result(data, mesh_detail="interactive", report_stage=None):
+    report_stage = report_stage or (lambda stage: None) # progress of the background job
 
     name = data.get("name", "")
-    electrodes = data.get("electrodes")
-    annotations = data.get("annotations")
-    coordinates = data.get("coordinates")
-    ply = data.get("ply")
+    session_id = data.get("session_id")
+    hashes = data.get("hashes")
+    if hashes is None or not estimapp_has_uploads(session_id):
+        return None # uploads are not (or no longer) stored on the server
+    try:
+        return (name,) + load_result(session_id, hashes, mesh_detail, report_stage)
+    except LookupError:
+        return None # uploads evicted while the result was computed
+
+def load_result(session_id, hashes, mesh_detail, report_stage):
+    # The cached results are found by the content hashes, the uploads are only read (from disk)
+    # when a decoded input is not cached
+    uploads = {}
+    def upload(key):
+        if not uploads:
+            stored = estimapp_load_uploads(session_id)
+            if stored is None:
+                raise LookupError(f"uploads of session {session_id} are no longer stored")
+            uploads.update(stored)
+        return uploads[key]
     
-    def decode_excel(content):
-        _, content_string = content.split(',')
-        decoded = base64.b64decode(content_string)
-        xls = pd.ExcelFile(io.BytesIO(decoded))
-        sheet_names = xls.sheet_names
-        print("sheet names", sheet_names)
-        if len(sheet_names) > 1 and "sjabloon" in sheet_names:
-            sheet_name = "sjabloon"
-        elif len(sheet_names) > 1 and "Sheet 1" in sheet_names:
-            sheet_name = "Sheet 1"
-        elif len(sheet_names) > 1 and "Sheet1" in sheet_names:
-            sheet_name = "Sheet1"
-        elif len(sheet_names) > 1 and "elektroden" in sheet_names:
-            sheet_name = "elektroden"
-        elif len(sheet_names) > 1 and "Elektroden" in sheet_names:
-            sheet_name = "Elektroden"
-        else:
-            sheet_name = 0 # Default to read first worksheet of excel file
-        decoded_excel = pd.read_excel(io.BytesIO(decoded), sheet_name=sheet_name, keep_default_na=False)
-        return decoded_excel
-
-    def decode_annotations(content):
-        _, content_string = content.split(',')
-        decoded = base64.b64decode(content_string)
-        
-        annotations = pd.read_csv(io.BytesIO(decoded),
-            encoding="latin1",     # handles special characters like °, é, etc.
-            sep="\t",              # tab-delimited
-            engine="python",       # more forgiving parser
-            quoting=csv.QUOTE_NONE # <-- ignore quotes completely
-        )     
-
-        return annotations
+    def decode_excel(key):
+        content = upload(key)
+        with estimapp_stage(f"decode {key}", bytes=len(content)):
+            return estimapp_read_excel(content)
+    
+    def decode_ply():
+        content = upload("ply")
+        with estimapp_stage("decode ply", bytes=len(content)):
+            return estimapp_read_ply(content)
+    
+    def decode_all_annotations():
+        with estimapp_stage("decode annotations", files=len(upload("annotations"))) as sizes:
+            annotations_df = estimapp_read_annotation_files(upload("annotations"), upload("annotation_names"))
+            sizes["rows"] = len(annotations_df)
+        logger.debug("annotation readers %s", annotations_df.attrs["reader"])
+        return annotations_df
+
+    # Decoded uploads and processed annotations are cached by content hash, 
+    # so only the first render of a session decodes and processes the uploads
+    def process_all_annotations():
+        annotations_df = session_cache.get_or_compute(("annotations", hashes["annotations"]), decode_all_annotations)
+        with estimapp_stage("process annotations", rows=len(annotations_df)) as sizes:
+            processed = estimapp_process_annotations(annotations_df)
+            sizes["pairs"] = len(processed[0])
+        return processed
     
-    def decode_ply(content):
-        _, content_string = content.split(',')
-        decoded = base64.b64decode(content_string)
-        mesh = trimesh.load(io.BytesIO(decoded), file_type='ply')
-        return mesh
-
-    print("decode annotations, file type:", type(annotations), type(annotations[0])) # <class 'list'> <class 'str'>
-    annotations_df = pd.DataFrame()
-    for file in annotations:
-        decoded_annotations = decode_annotations(file)
-        print("decoded annotations type", type(decoded_annotations), decoded_annotations.shape)
-        print("add annotations to dataframe")
-        annotations_df = pd.concat([annotations_df, decoded_annotations], ignore_index=True)
-
-    print("decoded annotations", type(annotations_df), "size df", annotations_df.shape, annotations_df['Comment']) #decoded annotations <class 'list'> <class 'pandas.core.frame.DataFrame'>
-
-    print('decoding electrodes')    
-    decoded_electrodes = decode_excel(electrodes) # df   
-    stimulations_df, processed_annotations, categories_dict = estimapp_process_annotations(annotations_df)
+    # Stages are only timed when they are computed, not when they are read from the cache
+    def timed(stage, compute, **sizes):
+        def compute_stage():
+            with estimapp_stage(stage, **sizes):
+                return compute()
+        return compute_stage
+    
+    report_stage("Reading electrodes overview")
+    decoded_electrodes = session_cache.get_or_compute(("electrodes", hashes["electrodes"]), 
+                                                      lambda: decode_excel("electrodes")) # df   
+    report_stage("Processing annotations")
+    stimulations_df, processed_annotations, categories_dict = session_cache.get_or_compute(("processed", hashes["annotations"]), 
+                                                                                           process_all_annotations)
     
     # 3D
-    coordinates_df = decode_excel(coordinates) if data.get("coordinates") else None
-    mesh = decode_ply(ply) if data.get("ply") else None
-    return name, decoded_electrodes, processed_annotations, categories_dict, coordinates_df, mesh
+    report_stage("Reading 3D inputs")
+    coordinates_df = session_cache.get_or_compute(("coordinates", hashes["coordinates"]), 
+                                                  lambda: decode_excel("coordinates")) if hashes["coordinates"] else None
+    def decimate_mesh():
+        full_mesh = session_cache.get_or_compute(("mesh", hashes["ply"]), decode_ply)
+        with estimapp_stage("decimate mesh", faces=len(full_mesh.faces)):
+            return estimapp_decimate_mesh(full_mesh)
+    
+    if not hashes["ply"]:
+        mesh = None
+    elif mesh_detail == "full":
+        mesh = session_cache.get_or_compute(("mesh", hashes["ply"]), decode_ply)
+    else:
+        # Lightweight surface for the interactive view, the full resolution mesh is only read when it is decimated or shown
+        report_stage("Decimating brain rendering")
+        mesh = session_cache.get_or_compute(("mesh decimated", hashes["ply"]), decimate_mesh)
+    
+    # Every electrode contact gets an ID once per session, shared by the 2D and 3D figures
+    report_stage("Localizing electrodes")
+    registry = session_cache.get_or_compute(("registry", hashes["electrodes"], hashes["coordinates"]), 
+                                            timed("build electrode registry", lambda: estimapp_build_electrode_registry(decoded_electrodes, coordinates_df)))
+    return decoded_electrodes, processed_annotations, categories_dict, coordinates_df, mesh, registry, hashes # hashes key the memoized table and figures
     
 # Page routing
 @app.callback(
@@ -226,7 +234,6 @@ def show_result(data):
     Input("main-url", "pathname")
     )
 def display_page(pathname):
-    print("📍 Navigated to pathname:", pathname)
     if pathname == "/result":
         return layout_result()
     else:
@@ -241,20 +248,18 @@ def display_page(pathname):
     State("name-input", "value"),
     State("upload-electrodes", "contents"),
     State("upload-annotations", "contents"),
+    State("upload-annotations", "filename"),
     State("upload-coordinates", "contents"),
     State("upload-ply", "contents"),
     
     prevent_initial_call=True
 )
-def handle_submit(n_clicks, name, electrodes, annotations, coordinates, ply):
+def handle_submit(n_clicks, name, electrodes, annotations, annotation_names, coordinates, ply):
     if n_clicks is None:
         raise dash.exceptions.PreventUpdate
     
-    print("🚨 Submit clicked")
-    print("  ↳ Electrodes content present:", isinstance(electrodes, str))
-    print("  ↳ Annotations content list:", isinstance(annotations, list), "Length:", len(annotations) if annotations else 0)
-    print("  ↳ Electrode coordinates content present:", isinstance(coordinates, str))
-    print("  ↳ PLY content present:", isinstance(ply, str)) # string?
+    logger.debug("submit: electrodes %s, annotation files %d, coordinates %s, ply %s", isinstance(electrodes, str), 
+                 len(annotations) if isinstance(annotations, list) else 0, isinstance(coordinates, str), isinstance(ply, str))
         
     missing = []
     if not electrodes or not isinstance(electrodes, str):
@@ -270,30 +275,106 @@ def handle_submit(n_clicks, name, electrodes, annotations, coordinates, ply):
             children="Please provide: " + ", ".join(missing)
         )
 
+    # Keep the uploads on the server, the browser only holds the session handle and the content hashes
+    session_id, hashes = estimapp_store_uploads(electrodes, annotations, coordinates, ply, annotation_names) # coordinates and ply are None if missing
     data = {
         "name": name or "",
-        "electrodes": electrodes,
-        "annotations": annotations,
-        "coordinates": coordinates,
-        "ply": ply # Default value if missing is None
+        "session_id": session_id,
+        "hashes": hashes
     }
     return "/result", data, None # None is default value for Alert missing data
 
 # Result Display
+def memoize_figure(hashes, render_params, generate_figure, **sizes):
+    # Figures are generated once and memoized on the hashes of the uploads (from show_result) and the render parameters
+    key = ("figure", tuple(hashes.values()), render_params)
+    def render():
+        with estimapp_stage(f"render {render_params[0]}", **sizes):
+            return generate_figure()
+    return session_cache.get_or_compute(key, render)
+
+def memoize_table(hashes, processed_annotations):
+    # The table is built once per session
+    def build_table():
+        with estimapp_stage("build table", pairs=len(processed_annotations)):
+            return estimapp_generate_table(processed_annotations)
+    return session_cache.get_or_compute(("table", hashes["annotations"]), build_table)
+
+def background_callback(*args, progress, cancel, **kwargs):
+    # Run a long callback as a Dash background callback on the job manager. Without a job manager 
+    # the callback runs in the server thread and set_progress does nothing
+    def register(func):
+        if background_callback_manager is not None:
+            return app.callback(*args, background=True, manager=background_callback_manager, 
+                                progress=progress, cancel=cancel, **kwargs)(func)
+        def run_in_server_thread(*func_args):
+            return func(lambda *progress_values: None, *func_args)
+        run_in_server_thread.__name__ = func.__name__
+        return app.callback(*args, **kwargs)(run_in_server_thread)
+    return register
+
+@background_callback(
+    Output("result-ready", "data"),
+    Input("session-data", "data"),
+    progress=[Output("result-progress", "children")],
+    cancel=[Input("main-url", "pathname")], # leaving the result page (e.g. to resubmit) cancels the job
+    running=[(Output("result-progress", "style"), {'font-family':'verdana', 'display':'block'}, {'font-family':'verdana', 'display':'none'})],
+)
+def prepare_result(set_progress, data):
+    # Decode and process the uploads and generate the table and figures once, 
+    # the result callbacks read them from the session cache
+    if not data:
+        return None
+    
+    def report_stage(stage):
+        set_progress(f"{stage}...")
+    
+    # A background job runs outside the server request, its stages are grouped under a new request ID
+    with estimapp_request(), estimapp_stage("prepare result"):
+        result = show_result(data, report_stage=report_stage)
+        if result is None:
+            return {"session_id": data.get("session_id"), "status": "expired"}
+        name, decoded_electrodes, processed_annotations, categories_dict, coordinates_df, mesh, registry, hashes = result
+        
+        report_stage("Building table")
+        memoize_table(hashes, processed_annotations)
+        report_stage("Generating 2D figure")
+        memoize_figure(hashes, ("2d",), lambda: estimapp_generate_plot(decoded_electrodes, processed_annotations, registry), 
+                       pairs=len(processed_annotations))
+        if mesh is not None and coordinates_df is not None:
+            # A failed 3D figure must not block the table and 2D figure, the 3D tab renders it again when selected
+            report_stage("Generating 3D figure")
+            try:
+                memoize_figure(hashes, ("3d", "interactive"), 
+                               lambda: estimapp_generate_3d_plot(mesh, coordinates_df, processed_annotations, registry=registry), 
+                               pairs=len(processed_annotations), faces=len(mesh.faces))
+            except Exception:
+                logger.exception("3D figure could not be generated")
+    return {"session_id": data.get("session_id"), "status": "ready"}
+
+def result_is_ready(ready, data):
+    # The result of the current session is prepared
+    if not data or not ready or ready.get("session_id") != data.get("session_id"):
+        raise dash.exceptions.PreventUpdate
+    return ready["status"] == "ready"
+
 @app.callback(
     Output("result-name", "children"),
     Output("result-table", "children"),
-    Output("result-tab-content", "children"),
     Output("processed-annotations", "data"),
-    Input("result-tabs", "value"), 
-    Input("session-data", "data"),
+    Input("result-ready", "data"),
+    State("session-data", "data"),
 )
-def update_result_tabs(tab, data):
+def update_result_table(ready, data):
+    # The table is outside the tabs and built once per session
     if not data:
-        return "No data submitted", html.Div(), html.Div(), html.Div()
+        return "No data submitted", html.Div(), html.Div()
     
-    name, decoded_electrodes, processed_annotations, categories_dict, coordinates_df, mesh = show_result(data)
-    table, table_columns = estimapp_generate_table(processed_annotations)
+    result = show_result(data) if result_is_ready(ready, data) else None
+    if result is None:
+        return "Session expired, please upload the files again", html.Div(), html.Div()
+    name, decoded_electrodes, processed_annotations, categories_dict, coordinates_df, mesh, registry, hashes = result
+    table, table_columns = memoize_table(hashes, processed_annotations)
     dropdown_individual_cat = set(categories_dict.values())
     dropdown_multiple_cat = set(table["Category"].unique())
     dropdown_menu = sorted(dropdown_individual_cat | dropdown_multiple_cat) # removes duplicates
@@ -331,18 +412,36 @@ def update_result_tabs(tab, data):
         ),
 ])
 
+    return f"{name}" if name else "No name provided", table_section, processed_annotations.to_json(date_format="iso", orient="split")
+
+@app.callback(
+    Output("result-tab-content", "children"),
+    Input("result-tabs", "value"), 
+    Input("result-ready", "data"),
+    State("session-data", "data"),
+)
+def update_result_tabs(tab, ready, data):
+    # Only the figure of the selected tab is shown
+    result = show_result(data) if data and result_is_ready(ready, data) else None
+    if result is None:
+        return html.Div()
+    name, decoded_electrodes, processed_annotations, categories_dict, coordinates_df, mesh, registry, hashes = result
+    
     if tab == "tab-2d":
-        print("Generating figure")
-        fig2d = dcc.Graph(id="result-plot-2d", figure = estimapp_generate_plot(decoded_electrodes, processed_annotations))
+        fig2d = dcc.Graph(id="result-plot-2d", figure = memoize_figure(hashes, ("2d",), 
+                          lambda: estimapp_generate_plot(decoded_electrodes, processed_annotations, registry), 
+                          pairs=len(processed_annotations)))
         
-        return f"{name}" if name else "No name provided", table_section, html.Div([ 
+        return html.Div([ 
                 html.Div(fig2d, 
                          style={"width": "auto", "display": "inline-block", "verticalAlign": "top", "margin": "0", "padding": "0", "backgroundColor": "rgba(0,0,0,0)"}),
                 html.Img(src='/assets/Legend.png', style={'width': '400px', "margin": "0", "marginBottom": "75px", "padding": "5px", "alignSelf": "flex-end"}) ],
-                style={"textAlign": "left", "whiteSpace": "nowrap", "display": "flex", "alignItems": "flex-end", "justifyContent": "flex-start"}), processed_annotations.to_json(date_format="iso", orient="split")
+                style={"textAlign": "left", "whiteSpace": "nowrap", "display": "flex", "alignItems": "flex-end", "justifyContent": "flex-start"})
     elif tab == "tab-3d" and mesh:
-        fig3d = estimapp_generate_3d_plot(mesh, coordinates_df, processed_annotations)
-        return f"{name}" if name else "No name provided", table_section, html.Div([
+        fig3d = memoize_figure(hashes, ("3d", "interactive"), 
+                               lambda: estimapp_generate_3d_plot(mesh, coordinates_df, processed_annotations, registry=registry), 
+                               pairs=len(processed_annotations), faces=len(mesh.faces))
+        return html.Div([
                 html.Div([
                     dcc.Graph(id="result-plot-3d", figure=fig3d, clear_on_unhover=True, style={"width":"1200px","height":"800px"}),
                     html.Div(id="hover-coords", style={
@@ -360,6 +459,10 @@ def update_result_tabs(tab, data):
                     }),
                     html.Label("Adjust cortex opacity:"),
                     dcc.Slider(id="opacity", min=0, max=1, step=0.1, value=0.8, marks={0: "0", 0.5: "0.5", 1: "1"}, updatemode="drag"),
+                    html.Label("Brain rendering detail:"),
+                    dcc.RadioItems(id="mesh-detail", options=[{"label": "Interactive", "value": "interactive"}, 
+                                                              {"label": "Full resolution", "value": "full"}], 
+                                   value="interactive", inline=True),
                 ], style={"position": "relative", "display": "inline-block", "verticalAlign": "top"}),
             
                 html.Img(src="/assets/Legend.png", style={
@@ -369,9 +472,9 @@ def update_result_tabs(tab, data):
                     "display": "inline-block",
                     "verticalAlign": "top"
                 })
-            ], style={"whiteSpace": "nowrap", "textAlign": "left"}), processed_annotations.to_json(date_format="iso", orient="split")
+            ], style={"whiteSpace": "nowrap", "textAlign": "left"})
     else:
-        return f"{name}" if name else "No name provided", table_section, html.Div("No PLY data uploaded for 3D visualization.", style={'font-family':'verdana'}), processed_annotations.to_json(date_format="iso", orient="split")
+        return html.Div("No PLY data uploaded for 3D visualization.", style={'font-family':'verdana'})
 
 # Table callbacks
 @app.callback(
@@ -394,7 +497,6 @@ def download_table(n_clicks, name, processed_annotations_json):
         raise dash.exceptions.PreventUpdate
     
     processed_annotations = pd.read_json(processed_annotations_json, orient="split")
-    print("download table")
 
     # return as CSV
     return dcc.send_data_frame(
@@ -407,49 +509,47 @@ def download_table(n_clicks, name, processed_annotations_json):
 @app.callback(
     Output("result-plot-3d", "figure"),
     Input("opacity", "value"),
-    State("result-plot-3d", "figure"),
-    State("result-plot-3d","relayoutData"),
     prevent_initial_call=True
 )
-def update_opacity(opacity, fig, relayoutData):
-    if not fig:
-        raise dash.exceptions.PreventUpdate
-
-    # Preserve current camera
-    camera = None
-    if relayoutData and "scene.camera" in relayoutData:
-        camera = relayoutData["scene.camera"]
-
-    # Update mesh opacity
-    for trace in fig["data"]:
-        if trace["type"] == "mesh3d":
-            trace["opacity"] = opacity
-
-    # Reapply preserved camera
-    if camera:
-        fig["layout"]["scene"]["camera"] = camera
-    
+def update_opacity(opacity):
+    # Only send the new mesh opacity to the browser. The brain surface is the first trace, 
+    # the current camera is kept in the browser by the uirevision of the figure
+    fig = Patch()
+    fig["data"][0]["opacity"] = opacity
     return fig
 
 @app.callback(
+    Output("result-plot-3d", "figure", allow_duplicate=True),
+    Input("mesh-detail", "value"),
+    State("session-data", "data"),
+    State("opacity", "value"),
+    prevent_initial_call=True
+)
+def update_mesh_detail(mesh_detail, data, opacity):
+    result = show_result(data, mesh_detail) if data else None
+    if result is None or result[5] is None:
+        raise dash.exceptions.PreventUpdate
+    
+    name, decoded_electrodes, processed_annotations, categories_dict, coordinates_df, mesh, registry, hashes = result
+    # One figure per mesh detail is memoized (default opacity), the current opacity is applied to a copy
+    fig3d = memoize_figure(hashes, ("3d", mesh_detail), 
+                           lambda: estimapp_generate_3d_plot(mesh, coordinates_df, processed_annotations, registry=registry), 
+                           pairs=len(processed_annotations), faces=len(mesh.faces))
+    if opacity == fig3d.data[0].opacity:
+        return fig3d
+    figure = fig3d.to_plotly_json() # copy, the memoized figure is shared by all callbacks
+    figure["data"][0]["opacity"] = opacity # brain surface
+    return figure
+
+# Hover readout of the 3D view, clientside (assets/estimapp_clientside.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="estimapp", function_name="display_hover_coordinates"),
     Output("hover-coords", "children"),
     Input("result-plot-3d", "hoverData"),
     prevent_initial_call=True
 )
-def display_hover_coordinates(hoverData):
-    if not hoverData or "points" not in hoverData:
-        return ""
-
-    point = hoverData["points"][0]
-    x, y, z = point.get("x"), point.get("y"), point.get("z")  
-    customdata = point.get("customdata")
-    electrode_label = customdata if customdata and len(customdata) > 0 else "N/A"
-
-    return html.Div([
-        html.Div(f"Electrode: {electrode_label}"),
-        html.Div(f"x: {x:.2f}, y: {y:.2f}, z: {z:.2f}")
-    ])
 
 # Run app
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    logging.basicConfig(level=os.environ.get("ESTIMAPP_LOG_LEVEL", "WARNING")) # INFO logs the timing of every stage
+    app.run(debug=os.environ.get("ESTIMAPP_DEBUG") == "1")
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Created on Fri Oct 16, 2026
+@author: Irene Heijink
+
+Run this script to create the EStiMapp output for many patients at once, without the dash app.
+The patients are processed in parallel over the available CPU cores.
+
+    python estimapp_batch.py <input folder> <output folder> [--workers N] [--figure-format html|png]
+
+Input:
+    input folder: a folder with one subfolder per patient. Every patient folder contains the same
+        files as the upload buttons of the app:
+
+        Electrodes overview: an excel file (xlsx) with the patient specific electrode scheme.
+
+        Annotations: one or multiple csv files with the EEG annotations during stimulation.
+
+        Optional, required for 3D rendering:
+
+        Electrode coordinates: an excel file (xlsx) with the columns ['electrode_name', 'nr_of_channels',
+            'entry_x', 'entry_y', 'entry_z', 'target_x', 'target_y', 'target_z']. The excel file with
+            the column electrode_name is used as electrode coordinates, the other as electrodes overview.
+
+        PLY brain rendering: a PLY file with the patient specific 3D brain rendering.
+
+Output:
+    output folder: one subfolder per patient with
+        <patient>_annotations.csv: the table of the app
+        <patient>_2d.html (or .png): the 2D figure
+        <patient>_3d.html (or .png): the 3D figure, only if electrode coordinates and PLY are present
+
+    A summary of all patients is printed. Failed patients are reported with their error
+    and do not stop the batch. The exit code is 1 if one or more patients failed.
+"""
+
+import argparse
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from functions.estimapp_read_inputs import estimapp_read_excel, estimapp_read_annotation_files, estimapp_read_ply
+from functions.estimapp_process_annotations import estimapp_process_annotations
+from functions.estimapp_generate_plot import estimapp_generate_plot
+from functions.estimapp_generate_table import estimapp_generate_table
+from functions.estimapp_generate_3d_plot import estimapp_generate_3d_plot
+
+def read_patient_folder(patient_dir):
+    electrodes_df = None
+    coordinates_df = None
+    annotations = []
+    annotation_names = []
+    mesh = None
+
+    for file_name in sorted(os.listdir(patient_dir)):
+        path = os.path.join(patient_dir, file_name)
+        extension = os.path.splitext(file_name)[1].lower()
+        if extension not in (".xlsx", ".csv", ".ply"):
+            continue
+        with open(path, "rb") as f:
+            decoded = f.read()
+
+        if extension == ".csv":
+            annotations.append(decoded)
+            annotation_names.append(file_name)
+        elif extension == ".ply":
+            mesh = estimapp_read_ply(decoded)
+        else:
+            excel_df = estimapp_read_excel(decoded)
+            if "electrode_name" in excel_df.columns:
+                coordinates_df = excel_df
+            else:
+                electrodes_df = excel_df
+
+    missing = []
+    if electrodes_df is None:
+        missing.append("Excel electrodes")
+    if not annotations:
+        missing.append("Annotations")
+    if missing:
+        raise FileNotFoundError("Please provide: " + ", ".join(missing))
+
+    annotations_df = estimapp_read_annotation_files(annotations, annotation_names)
+    return electrodes_df, annotations_df, coordinates_df, mesh
+
+def write_figure(fig, path, figure_format):
+    path = f"{path}.{figure_format}"
+    if figure_format == "png":
+        fig.write_image(path) # requires the kaleido package
+    else:
+        fig.write_html(path)
+    return path
+
+def process_patient(patient_dir, output_dir, figure_format="html"):
+    # Runs in a worker process, returns (patient, list of written files, error)
+    patient = os.path.basename(os.path.normpath(patient_dir))
+    try:
+        electrodes_df, annotations_df, coordinates_df, mesh = read_patient_folder(patient_dir)
+        stimulations_df, processed_annotations, categories_dict = estimapp_process_annotations(annotations_df)
+
+        patient_output_dir = os.path.join(output_dir, patient)
+        os.makedirs(patient_output_dir, exist_ok=True)
+        written = []
+
+        table, _ = estimapp_generate_table(processed_annotations)
+        table_path = os.path.join(patient_output_dir, f"{patient}_annotations.csv")
+        table.to_csv(table_path, index=False)
+        written.append(table_path)
+
+        fig2d = estimapp_generate_plot(electrodes_df, processed_annotations)
+        written.append(write_figure(fig2d, os.path.join(patient_output_dir, f"{patient}_2d"), figure_format))
+
+        if mesh is not None and coordinates_df is not None:
+            fig3d = estimapp_generate_3d_plot(mesh, coordinates_df, processed_annotations)
+            written.append(write_figure(fig3d, os.path.join(patient_output_dir, f"{patient}_3d"), figure_format))
+
+        return patient, written, None
+    except Exception:
+        return patient, [], traceback.format_exc()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create the EStiMapp table and figures for every patient folder.")
+    parser.add_argument("input_dir", help="folder with one subfolder per patient")
+    parser.add_argument("output_dir", help="folder to write the table and figures per patient")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes. Default = number of CPU cores")
+    parser.add_argument("--figure-format", choices=["html", "png"], default="html", help="file format of the figures. Default = html")
+    args = parser.parse_args(argv)
+
+    patient_dirs = [os.path.join(args.input_dir, name) for name in sorted(os.listdir(args.input_dir))
+                    if os.path.isdir(os.path.join(args.input_dir, name))]
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    failed = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_patient, patient_dir, args.output_dir, args.figure_format): patient_dir
+                   for patient_dir in patient_dirs}
+        for future in as_completed(futures):
+            patient = os.path.basename(futures[future])
+            try:
+                patient, written, error = future.result()
+            except Exception as e: # e.g. a worker process that crashed
+                written, error = [], repr(e)
+            if error:
+                failed[patient] = error
+                print(f"FAILED {patient}")
+            else:
+                print(f"OK     {patient}: " + ", ".join(os.path.basename(path) for path in written))
+
+    print(f"\n{len(patient_dirs) - len(failed)} of {len(patient_dirs)} patients processed")
+    for patient, error in failed.items():
+        print(f"\n--- {patient} ---\n{error}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16, 2026
+
+@author: iheijink
+
+This module contains the registry of all categories of evoked clinical symptoms.
+It is shared by all functions that recognize or show the annotated categories.
+
+Output:
+    categories_abbreviations: A dictionary with key the abbreviation of the category 
+        used in the annotations and value the full name of the category.
+        The order of this dictionary is the order of the categories per stimulation pair.
+
+    categories_colors: A dictionary with key the full name of the category and value the color
+        of the category in the 3D figure (same colors as the icons in the 2D figure).
+"""
+
+categories_abbreviations = {'mo':'motor', 'sm':'elementary motor', 'cm':'complex motor','la':'language', 'vest':'vestibular', 'auto':'autonomic', 
+                            'aff':'affective', 'cog':'cognitive', 'sts':'somatosensory', 'vis':'visual', 
+                            'audi':'auditory', 'og':'olfactory or gustatory', 'ot':'other', '?':'patient in doubt', 
+                            '!':'pay attention', 'sz':'seizure', 'AD':'after discharge'}
+
+categories_colors = {"motor":"rgb(237,28,36)", "elementary motor":"rgb(237,28,36)", "complex motor":"rgb(159,29,32)", 
+                     "language":"rgb(0,166,81)", "visual":"rgb(0,114,188)", "emotional":"rgb(247,148,29)", "affective":"rgb(247,148,29)",
+                     "autonomic":"rgb(143,83,161)", "auditory":"rgb(0,174,239)","cognitive":"rgb(144,208,180)",
+                     "vestibular":"rgb(239,154,192)","olfactory or gustatory":"rgb(166,117,79)","other":"rgb(147,149,152)",
+                     "somatosensory":"rgb(254,225,15)", "after discharge":"rgb(255,255,255)", "patient in doubt":"rgb(147,149,152)",
+                     "pay attention":"rgb(236,0,140)", "seizure":"rgb(35,31,32)", "recognizable":"rgb(255,0,0)", "not recognizable":"rgb(255,0,0)"}
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16, 2026
+
+@author: iheijink
+
+This function classifies every annotation in one pass as a category of evoked clinical
+symptoms, a stimulation marker (Stim_on; or Stim_off;), a stimulated electrode pair or free text.
+The categories are recognized with the shared category registry.
+
+Input:
+    annotations_df: a dataframe containing all annotations during stimulation
+
+    column_name: the column name in the annotations files where the notes are located.
+        Default = 'Comment'
+
+Output:
+    annotations_df: a copy of annotations_df with the classification of every annotation.
+        AnnotationType: category, stim marker, stim pair or free text.
+        AnnotationLabel: the full name of the category, or Stim_on or Stim_off for a stim marker.
+        Electrode 1 and Electrode 2: the stimulated electrodes of a stim pair, ordered low-high
+            and with 2 digits in the electrode names (e.g. AR02 - AR1 becomes AR01 - AR02).
+"""
+import numpy as np
+
+from functions.estimapp_category_registry import categories_abbreviations
+from functions.estimapp_electrode_registry import estimapp_normalize_electrode_names
+
+def estimapp_classify_annotations(annotations_df, column_name="Comment"):
+    notes = annotations_df[column_name].fillna('').astype(str)
+
+    # Categories are annotated with only the abbreviation, case insensitive
+    categories_casefold = {abbr.casefold(): category for abbr, category in categories_abbreviations.items()}
+    category = notes.str.casefold().map(categories_casefold)
+    stimMarker = notes.str.extract(r'(Stim_on|Stim_off)', expand=False)
+
+    # Stimulation pairs are only searched in the remaining annotations
+    remaining = category.isna() & stimMarker.isna()
+    pattern = r'([a-zA-Z]{1,3})(\d{1,2})(?:\s*-?\s*)\1(\d{1,2})' # group 1 (1-3 letters) + group 2 (1 or 2 digits) + optional space + group 1 + group 3 (1 or 2 digits)
+    matches = notes[remaining].str.extractall(pattern)
+    matches = matches[matches[1] != matches[2]] # Filter only where the digits are different
+    matches = matches[~matches.index.get_level_values(0).duplicated()].droplevel(1) # first stimulation pair per annotation
+
+    # Switch order to low-high if the first electrode number is higher, e.g. AR02 - AR01 to AR01 - AR02
+    switch = matches[1].astype(int) > matches[2].astype(int)
+    electrode1 = estimapp_normalize_electrode_names(matches[0] + matches[1].where(~switch, matches[2])) # canonical electrode names (e.g. change AR1 to AR01)
+    electrode2 = estimapp_normalize_electrode_names(matches[0] + matches[2].where(~switch, matches[1]))
+    stimPair = annotations_df.index.isin(matches.index)
+
+    annotationType = np.select([stimMarker.notna(), category.notna(), stimPair], ['stim marker', 'category', 'stim pair'], default='free text')
+    return annotations_df.assign(AnnotationType=annotationType,
+                                 AnnotationLabel=stimMarker.fillna(category),
+                                 **{'Electrode 1': electrode1.reindex(annotations_df.index),
+                                    'Electrode 2': electrode2.reindex(annotations_df.index)})
@@ -7,7 +7,8 @@ Created on Tue May 6, 2025
 This function creates a dataframe stimulations overview. 
 
 Input: 
-    annotations_df: a dataframe containing all annotations during stimulation
+    annotations_df: a dataframe containing all annotations during stimulation, 
+        classified by estimapp_classify_annotations
     
     categories: a dictionary containing all categories of evoked clinical symptoms
         and the annotation index where this symptom was present
@@ -26,104 +27,53 @@ Output:
     categories_abbreviations: A dictionary with key the abbreviation of the category 
         used in the annotations and value the full name of the category.
 """
+import numpy as np
 import pandas as pd
-import re
-    
-def estimapp_create_stimulations_overview(annotations_df, categories, stimPeriod, column_name):
 
-    stimulations_df = pd.DataFrame(columns=['Electrode 1', 'Electrode 2', 'AnnotationIndex', 'Category', 'Free text', 'Stim type'])
-    pattern = r'([a-zA-Z]{1,3})(\d{1,2})(?:\s*-?\s*)\1(\d{1,2})' # group 1 (1-3 letters) + group 2 (1 or 2 digits) + optional space + group 1 + group 3 (1 or 2 digits)
-    count_stimulations = 0
-    for i in range(len(annotations_df)):
-        matches = re.findall(pattern, annotations_df.loc[i,column_name])
-            
-        # Filter only where the digits are different
-        filtered_matches = [f"{m[0]}{m[1]} {m[0]}{m[2]}" for m in matches if m[1] != m[2]]
-        split_matches = [match.split() for match in filtered_matches]
+from functions.estimapp_category_registry import categories_abbreviations
 
-        if split_matches:
-            if int(matches[0][1]) > int(matches[0][2]): # First electrode number is lower than second, e.g. AR02 - AR01
-            #     # Switch order to low-high, e.g. AR01 - AR02
-                elec1 = split_matches[0][1]
-                split_matches[0][1] = split_matches[0][0]
-                split_matches[0][0] = elec1
-            stimulations_df = pd.concat([stimulations_df, pd.DataFrame(split_matches, columns=['Electrode 1', 'Electrode 2'])],
-                                        ignore_index=True)
-            stimulations_df.loc[count_stimulations, 'AnnotationIndex'] = i
-            count_stimulations += 1
+def estimapp_find_preceding_stimulation(indices_stimulations, indices_annotations):
+    # Stimulation pair is annotated before the category or free text annotation. So look for the
+    # position of the smaller closest value in the sorted indices_stimulations, -1 if there is none
+    return np.searchsorted(indices_stimulations, np.asarray(indices_annotations), side='left') - 1
     
-    del matches, filtered_matches, split_matches, count_stimulations, i, pattern # housekeeping
-
-    for idx in stimulations_df.index: # 2 digits in electrode names (e.g. change AR1 to AR01)
-        stimulations_df.loc[idx,"Electrode 1"] = re.sub(r'^([a-zA-Z]{1,3})(\d)$', r'\g<1>0\g<2>', stimulations_df.loc[idx,"Electrode 1"])
-        stimulations_df.loc[idx,"Electrode 2"] = re.sub(r'^([a-zA-Z]{1,3})(\d)$', r'\g<1>0\g<2>', stimulations_df.loc[idx,"Electrode 2"])
-
-    # Add stimtype, categories and free text to stimulations_df
-    categories_abbreviations = {'mo':'motor', 'sm':'elementary motor', 'cm':'complex motor','la':'language', 'vest':'vestibular', 'auto':'autonomic', 
-                                'aff':'affective', 'cog':'cognitive', 'sts':'somatosensory', 'vis':'visual', 
-                                'audi':'auditory', 'og':'olfactory or gustatory', 'ot':'other', '?':'patient in doubt', 
-                                '!':'pay attention', 'sz':'seizure', 'AD':'after discharge'}
-    for cat in categories:
-        if not categories[cat]:  # Skip if the list is empty
-            continue
-        for index in categories[cat]: # index of category annotation
-            # Stimulation pair is annotated before category annotation. So look for 
-            # smaller closest value in stimulation_df AnnotationIndex
-            smaller_values = stimulations_df[stimulations_df["AnnotationIndex"] < index]
-            smaller_closest_value = smaller_values["AnnotationIndex"].max()
-            stimulations_row = stimulations_df[stimulations_df["AnnotationIndex"] == smaller_closest_value].index[0]
-            current_value = stimulations_df.loc[stimulations_row,"Category"]
-            cat_full = categories_abbreviations[cat] # full name
-            
-            # add category (current_value) to stimulations_df at row of stimulated electrodes
-            if not isinstance(current_value, list) and pd.isna(current_value): 
-                # If NaN or empty, set to a list with the current cat
-                stimulations_df.at[stimulations_row, "Category"] = [cat_full]
-            elif cat_full not in current_value:
-                current_value.append(cat_full)
-                stimulations_df.at[stimulations_row, "Category"] = current_value
-    del cat, smaller_values, smaller_closest_value, stimulations_row, current_value, cat_full, index # housekeeping
-
+def estimapp_create_stimulations_overview(annotations_df, categories, stimPeriod, column_name):
 
-    for period in range(0,len(stimPeriod.index),2):
-        idx_stimOn = stimPeriod.index[period]
-        idx_stimOff = stimPeriod.index[period + 1]
-        stimType = stimPeriod.loc[stimPeriod.index[period], column_name]        
-        stimType = stimType[8:]
+    # Stimulation pairs are classified by estimapp_classify_annotations
+    stimPairs = annotations_df[annotations_df['AnnotationType'] == 'stim pair']
+    stimulations_df = pd.DataFrame(index=range(len(stimPairs)), columns=['Electrode 1', 'Electrode 2', 'AnnotationIndex', 'Category', 'Free text', 'Stim type'], dtype=object)
+    stimulations_df['Electrode 1'] = stimPairs['Electrode 1'].to_numpy()
+    stimulations_df['Electrode 2'] = stimPairs['Electrode 2'].to_numpy()
+    stimulations_df['AnnotationIndex'] = stimPairs.index.to_numpy()
+    del stimPairs # housekeeping
 
-        stimulations_row = stimulations_df["AnnotationIndex"].between(idx_stimOn, idx_stimOff) 
-        stimulations_df.loc[stimulations_row, "Stim type"] = stimType
-    del period, idx_stimOn, idx_stimOff, stimType, stimulations_row
-        
-    indices_categories = [index for sublist in categories.values() for index in sublist]
-    indices_stimulations = stimulations_df["AnnotationIndex"]
-    indices_all = pd.concat([pd.Series(indices_categories), indices_stimulations, stimPeriod.index.to_series()], ignore_index=True)
-    indices_freetext = [i for i in annotations_df.index if i not in set(indices_all)]
+    # Add stimtype, categories and free text to stimulations_df.
+    # Every annotation is linked to the closest stimulation pair annotated before it
+    indices_stimulations = stimulations_df['AnnotationIndex'].to_numpy(dtype=np.int64)
+    
+    # Categories, in the order of the categories dictionary
+    category_rows = pd.DataFrame([(index, categories_abbreviations[cat]) for cat in categories for index in categories[cat]],
+                                 columns=['AnnotationIndex', 'Category'])
+    category_rows['Stimulation'] = estimapp_find_preceding_stimulation(indices_stimulations, category_rows['AnnotationIndex'])
+    category_rows = category_rows[category_rows['Stimulation'] >= 0].drop_duplicates(['Stimulation', 'Category'])
+    stimulations_df['Category'] = category_rows.groupby('Stimulation', sort=False)['Category'].agg(list).reindex(stimulations_df.index)
 
-    freeText_df = annotations_df.iloc[indices_freetext]
-    for index in freeText_df.index:
-        # Stimulation pair is annotated before free text annotation. So look for 
-        # smaller closest value in freeText_df
-        smaller_values = stimulations_df[stimulations_df["AnnotationIndex"] < index]
-        if smaller_values.empty:
-            continue # annotation is not linked to a stimulation pair
-        smaller_closest_value = smaller_values["AnnotationIndex"].max()
-        stimulations_row = stimulations_df[stimulations_df["AnnotationIndex"] == smaller_closest_value].index[0]
-        current_freeText = stimulations_df.loc[stimulations_row,"Free text"]
-        
-        current_annotation = freeText_df.at[index, column_name]
-        if current_annotation == "nothing":
-            continue # do not show in stimulations overview
+    # Stim type of the Stim_on; annotation of the period the stimulation pair is in
+    idx_stimOn = stimPeriod.index[0::2].to_numpy()
+    idx_stimOff = stimPeriod.index[1::2].to_numpy()
+    stimTypes = stimPeriod[column_name].iloc[0::2].str[8:].to_numpy()
+    period = np.searchsorted(idx_stimOn[:len(idx_stimOff)], indices_stimulations, side='right') - 1 # last Stim_on; before the stimulation pair
+    in_period = period >= 0
+    in_period[in_period] = indices_stimulations[in_period] <= idx_stimOff[period[in_period]]
+    stimulations_df.loc[in_period, 'Stim type'] = stimTypes[period[in_period]]
         
-        if not isinstance(current_freeText, list) and pd.isna(current_freeText):
-            # If NaN, set to a list with the current cat
-            stimulations_df.at[stimulations_row, "Free text"] = [current_annotation]
-        else:
-            current_freeText.append(current_annotation)
-            stimulations_df.at[stimulations_row, "Free text"] = current_freeText
-            
-    del index, smaller_values, smaller_closest_value, stimulations_row, current_freeText, current_annotation
-    del indices_categories, indices_stimulations, indices_all, indices_freetext
+    # Free text: all annotations that are not a category, stimulation pair or Stim_on; and Stim_off;
+    freeText = annotations_df.loc[annotations_df['AnnotationType'] == 'free text', column_name]
+    freeText_stimulation = pd.Series(estimapp_find_preceding_stimulation(indices_stimulations, freeText.index), index=freeText.index)
+    linked = (freeText_stimulation >= 0) & (freeText != "nothing") # "nothing" is not shown in stimulations overview
+    stimulations_df['Free text'] = freeText[linked].groupby(freeText_stimulation[linked], sort=False).agg(list).reindex(stimulations_df.index)
+    del category_rows, idx_stimOn, idx_stimOff, stimTypes, period, in_period
+    del indices_stimulations, freeText, freeText_stimulation, linked
     
     # Filter table: 
     # only when Category or Free text is filled in
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16, 2026
+
+@author: iheijink
+
+This function decimates the 3D brain rendering to a lighter mesh for the interactive 3D view.
+Quadric decimation is used if the optional package fast_simplification is installed,
+otherwise the vertices are clustered on a regular grid.
+
+Input:
+    mesh_loaded: the decoded 3D PLY object containing the brain rendering.
+
+    target_faces: the number of faces of the decimated mesh (approximately, when the vertices are clustered).
+        Default = environment variable ESTIMAPP_MESH_FACES or 100000
+
+    quality: the fraction (0-1) of faces to keep, used instead of target_faces if given. Default = None
+
+Output:
+    mesh_decimated: the decimated mesh, or mesh_loaded if it already has fewer faces than target_faces.
+"""
+import os
+import numpy as np
+
+def estimapp_decimate_mesh(mesh_loaded, target_faces=None, quality=None):
+    nr_of_faces = len(mesh_loaded.faces)
+    if quality is not None:
+        target_faces = int(nr_of_faces * quality)
+    elif target_faces is None:
+        target_faces = int(os.environ.get("ESTIMAPP_MESH_FACES", 100000))
+    if nr_of_faces <= target_faces:
+        return mesh_loaded
+
+    try:
+        return mesh_loaded.simplify_quadric_decimation(face_count=target_faces) # requires fast_simplification
+    except ImportError:
+        pass
+
+    # Vertex clustering: for a surface the number of occupied grid cells is about area / cell_size**2,
+    # and a triangulated surface has about twice as many faces as vertices
+    vertices = np.asarray(mesh_loaded.vertices, dtype=float)
+    faces = np.asarray(mesh_loaded.faces)
+    cell_size = np.sqrt(2 * mesh_loaded.area / target_faces)
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    _, cluster, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.ravel()
+
+    # Every cluster is replaced by the mean position of its vertices
+    vertices_decimated = np.zeros((len(counts), 3))
+    np.add.at(vertices_decimated, cluster, vertices)
+    vertices_decimated /= counts[:, None]
+
+    # Remove faces that collapsed to a line or point, and duplicate faces
+    faces_decimated = cluster[faces]
+    collapsed = (faces_decimated[:, 0] == faces_decimated[:, 1]) | (faces_decimated[:, 1] == faces_decimated[:, 2]) | \
+                (faces_decimated[:, 0] == faces_decimated[:, 2])
+    faces_decimated = faces_decimated[~collapsed]
+    _, unique_faces = np.unique(np.sort(faces_decimated, axis=1), axis=0, return_index=True)
+    faces_decimated = faces_decimated[np.sort(unique_faces)]
+
+    import trimesh
+    return trimesh.Trimesh(vertices=vertices_decimated, faces=faces_decimated, process=False)
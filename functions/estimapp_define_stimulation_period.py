@@ -1,29 +1,52 @@
 # -*- coding: utf-8 -*-
 """
-Created on Tue May  6 
+Created on Tue May  6
 @author: iheijink
 
-This function defines the stimulation period based on Stim_on; and Stim_off; annotations
+This function defines the stimulation period based on Stim_on; and Stim_off; annotations.
+All annotations are labelled in one pass with the stimulation period they belong to.
+
+Input:
+    annotations_df: a dataframe containing all annotations during stimulation, 
+        classified by estimapp_classify_annotations
 
-Input: 
-    annotations_df: a dataframe containing all annotations during stimulation
-    
-    column_name: the column name in the annotations files where the notes are located.
-        Default = 'Comment'
-    
 Output:
-    stimPeriod: a dataframe containing all Stim_on; and Stim_off; annotations including annotation index
+    annotations_df: a copy of annotations_df with an extra column.
+        StimPeriod: the number of the stimulation period (starting at 0) for all annotations
+            from Stim_on; up to and including Stim_off;, -1 for annotations outside a stimulation period.
+
+    A ValueError is raised with the row of every Stim_on; without Stim_off; and every Stim_off; without Stim_on;
+        (the row in its annotations file if annotations_df has the columns SourceFile and SourceRow)
 """
-import pandas as pd
-
-def estimapp_define_stimulation_period(annotations_df, column_name):
-    print('function define stimulation period')
-    print(type(annotations_df))
-    print("Length of annotations_df:", len(annotations_df))
-    
-    stimPeriod = annotations_df[annotations_df[column_name].str.contains("Stim_on", na=False)]
-    
-    stimPeriod = pd.concat([stimPeriod, annotations_df[annotations_df[column_name].str.contains("Stim_off", na=False)]])
-    stimPeriod = stimPeriod.sort_index()
-       
-    return stimPeriod
\ No newline at end of file
+import numpy as np
+
+def estimapp_define_stimulation_period(annotations_df):
+    stimMarker = annotations_df["AnnotationLabel"].where(annotations_df["AnnotationType"] == "stim marker")
+    stimOn = (stimMarker == "Stim_on").to_numpy()
+    stimOff = (stimMarker == "Stim_off").to_numpy()
+
+    # Check if Stim_on and Stim_off alternate, starting with Stim_on
+    markers = stimMarker.dropna()
+    sequence = markers.to_numpy()
+    unbalanced = np.zeros(len(sequence), dtype=bool)
+    unbalanced[:-1] |= (sequence[:-1] == "Stim_on") & (sequence[1:] == "Stim_on") # Stim_on without Stim_off
+    unbalanced[1:] |= (sequence[1:] == "Stim_off") & (sequence[:-1] == "Stim_off") # Stim_off without Stim_on
+    if len(sequence):
+        unbalanced[0] |= sequence[0] == "Stim_off"
+        unbalanced[-1] |= sequence[-1] == "Stim_on"
+    if unbalanced.any():
+        if {"SourceFile", "SourceRow"}.issubset(annotations_df.columns): # row in the annotations file
+            sources = annotations_df.loc[markers.index[unbalanced], ["SourceFile", "SourceRow"]]
+            rows = [f"{marker} at row {sourceRow} ({sourceFile})" for marker, sourceFile, sourceRow in 
+                    zip(markers[unbalanced], sources["SourceFile"], sources["SourceRow"])]
+        else:
+            rows = [f"{marker} at row {row}" for row, marker in markers[unbalanced].items()]
+        rows = ", ".join(rows)
+        raise ValueError(f"Stim_on or Stim_off annotation missing, adjust in annotations overview Excel ({rows})")
+
+    # Inside a stimulation period the number of Stim_on is one more than the number of Stim_off,
+    # Stim_off itself is part of the stimulation period
+    inPeriod = (np.cumsum(stimOn) - np.cumsum(stimOff) == 1) | stimOff
+    stimPeriod = np.where(inPeriod, np.cumsum(stimOn) - 1, -1)
+
+    return annotations_df.assign(StimPeriod=stimPeriod)
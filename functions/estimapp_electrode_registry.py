@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16, 2026
+
+@author: iheijink
+
+This module contains the electrode registry: every electrode contact of a session gets an
+integer ID once, with O(1) lookups from the contact name to the position in the 2D electrode
+overview and to the 3D coordinate. All contact names are written in one canonical way:
+the electrode name and 2 digits for the contact number (e.g. AR1 becomes AR01).
+
+Input:
+    electrodes_df: a dataframe with the 2D configuration of patient specific electrodes.
+
+    electrode_coordinates: a dataframe with the patient specific electrode names,
+        number of channels, and entry and target coordinates of the implanted electrodes. Default = None
+
+Output:
+    registry: an EstimappElectrodeRegistry with all contacts of electrodes_df (in the order of the
+        channel list of estimapp_localize_electrode_positions) and electrode_coordinates.
+"""
+import re
+import numpy as np
+
+_single_digit = re.compile(r'^(\D*)(\d)$')
+
+def estimapp_normalize_electrode_name(name):
+    # 2 digits in electrode names (e.g. change AR1 to AR01)
+    return _single_digit.sub(r'\g<1>0\g<2>', str(name))
+
+def estimapp_normalize_electrode_names(names):
+    # Same as estimapp_normalize_electrode_name for a pandas Series of names
+    return names.astype(str).str.replace(_single_digit, r'\g<1>0\g<2>', regex=True)
+
+class EstimappElectrodeRegistry:
+    def __init__(self):
+        self.names = []            # ID -> contact name
+        self._ids = {}             # contact name -> ID
+        self._channel_index = []   # ID -> index in the channel list and topo of the 2D overview, -1 if not in the overview
+        self._positions = {}       # contact name -> (row, column) in the 2D overview
+        self._coordinates = []     # ID -> (x, y, z), NaN if there are no electrode coordinates
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return estimapp_normalize_electrode_name(name) in self._ids
+
+    def intern(self, name):
+        name = estimapp_normalize_electrode_name(name)
+        if name not in self._ids:
+            self._ids[name] = len(self.names)
+            self.names.append(name)
+            self._channel_index.append(-1)
+            self._coordinates.append((np.nan, np.nan, np.nan))
+        return self._ids[name]
+
+    def id(self, name):
+        return self._ids[estimapp_normalize_electrode_name(name)]
+
+    def ids(self, names):
+        # IDs of all names, -1 for names that are not in the registry
+        return np.array([self._ids.get(estimapp_normalize_electrode_name(name), -1) for name in names], dtype=np.int64)
+
+    def add_channels(self, channel, positions):
+        # channel and positions: output of estimapp_localize_electrode_positions
+        for index, name in enumerate(channel):
+            contact_id = self.intern(name)
+            if self._channel_index[contact_id] < 0: # first occurrence, as channel.index()
+                self._channel_index[contact_id] = index
+        self._positions.update(positions)
+
+    def add_coordinates(self, interpolated_electrodes):
+        # interpolated_electrodes: output of estimapp_interpolate_electrodes
+        for name, x, y, z in zip(interpolated_electrodes.index, interpolated_electrodes['X'],
+                                 interpolated_electrodes['Y'], interpolated_electrodes['Z']):
+            self._coordinates[self.intern(name)] = (x, y, z)
+
+    def channel_index(self, name):
+        # Index in the channel list and topo, replaces channel.index(name)
+        contact_id = self._ids.get(estimapp_normalize_electrode_name(name), -1)
+        index = self._channel_index[contact_id] if contact_id >= 0 else -1
+        if index < 0:
+            raise ValueError(f"{name} is not in the electrodes overview")
+        return index
+
+    def grid_position(self, name):
+        # (row, column) in the 2D overview, None if not in the overview
+        return self._positions.get(estimapp_normalize_electrode_name(name))
+
+    def coordinates(self, names):
+        # (x, y, z) of all names as an array, NaN for unknown names
+        coordinates = np.array(self._coordinates + [(np.nan, np.nan, np.nan)], dtype=float)
+        return coordinates[self.ids(names)] # ID -1 selects the NaN row
+
+def estimapp_build_electrode_registry(electrodes_df, electrode_coordinates=None):
+    from functions.estimapp_localize_electrode_positions import estimapp_localize_electrode_positions
+    from functions.estimapp_interpolate_electrodes import estimapp_interpolate_electrodes
+
+    registry = EstimappElectrodeRegistry()
+    _, channel, positions = estimapp_localize_electrode_positions(electrodes_df)
+    registry.add_channels(channel, positions)
+    if electrode_coordinates is not None:
+        registry.add_coordinates(estimapp_interpolate_electrodes(electrode_coordinates))
+    return registry
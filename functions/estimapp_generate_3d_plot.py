@@ -18,6 +18,9 @@ Input:
     
     flip_mode: the mode to flip the brain rendering. Default = "xy"
     
+    registry: the electrode registry with the coordinates of electrode_coordinates
+        (output from estimapp_build_electrode_registry). Default = None, the registry is created from electrode_coordinates
+    
 Output:
     fig: a plotly figure with the 3D projection of clinical symptom categories on the electrodes implanted in the brain.
 """
@@ -25,8 +28,10 @@ import plotly.graph_objs as go
 import numpy as np
 
 from functions.estimapp_interpolate_electrodes import estimapp_interpolate_electrodes
+from functions.estimapp_category_registry import categories_colors
+from functions.estimapp_electrode_registry import EstimappElectrodeRegistry
 
-def estimapp_generate_3d_plot(mesh_loaded, electrode_coordinates, stimulations_df, opacity=0.8, flip_mode="xy"):
+def estimapp_generate_3d_plot(mesh_loaded, electrode_coordinates, stimulations_df, opacity=0.8, flip_mode="xy", registry=None):
     """
     ply_mesh: object with .vertices (N,3) and .faces (M,3) or a (verts, faces) tuple
     flip_mode: "none" | "x" | "y" | "z" | "xy" | "xz" | "yz" | "xyz"
@@ -55,20 +60,22 @@ def estimapp_generate_3d_plot(mesh_loaded, electrode_coordinates, stimulations_d
     
     # Calculate electrode coordinates
     electrode_coordinates_interpolated = estimapp_interpolate_electrodes(electrode_coordinates)
+    if registry is None:
+        registry = EstimappElectrodeRegistry()
+        registry.add_coordinates(electrode_coordinates_interpolated)
     
     # Electrode labels
+    electrode_names = electrode_coordinates_interpolated.index
     text_labels=[""]*len(electrode_coordinates_interpolated)
-    contacts01 = electrode_coordinates_interpolated['Electrode'].str.endswith('01')
-    idx_contacts_01 = electrode_coordinates_interpolated.index[contacts01].to_numpy() # first contact point
+    idx_contacts_01 = np.flatnonzero(electrode_names.str.endswith('01')) # first contact point
     idx_contacts_last = idx_contacts_01 - 1 # last contact point
     idx_contacts_last[0] = len(electrode_coordinates_interpolated)-1 # replace -1 with highest index
     idx_labels = np.concatenate((idx_contacts_01, idx_contacts_last))
     for idx in idx_labels:
-        elec = electrode_coordinates_interpolated['Electrode'][idx]
+        elec = electrode_names[idx]
         text_labels[idx] = elec
        
-    hover_labels = electrode_coordinates_interpolated['Electrode']
-    print("hover labels", hover_labels)
+    hover_labels = electrode_names.to_series()
     
     # Plot electrode coordinates
     fig.add_trace(go.Scatter3d(
@@ -84,67 +91,40 @@ def estimapp_generate_3d_plot(mesh_loaded, electrode_coordinates, stimulations_d
         showlegend=False
         
     ))
-    fig.update_layout(scene_camera=dict(up=dict(x=0, y=0, z=1),), scene_dragmode='turntable', hovermode='closest',
+    fig.update_layout(scene_camera=dict(up=dict(x=0, y=0, z=1),), scene_dragmode='turntable', hovermode='closest', 
+                      uirevision='estimapp-3d', # keep camera when the figure is updated (e.g. opacity)
                       scene = dict(xaxis = dict(showgrid = False, showbackground=False, showticklabels = False, showline=False, zeroline=False, showspikes=False),  
                                    yaxis = dict(showgrid = False, showbackground=False, showticklabels = False, showline=False, zeroline=False, showspikes=False), 
                                    zaxis = dict(showgrid = False, showbackground=False, showticklabels = False, showline=False, zeroline=False, showspikes=False))) 
   
-    # Color map
-    color_map = {"motor":"rgb(237,28,36)", "elementary motor":"rgb(237,28,36)", "complex motor":"rgb(159,29,32)", 
-                 "language":"rgb(0,166,81)", "visual":"rgb(0,114,188)", "emotional":"rgb(247,148,29)",
-                 "autonomic":"rgb(143,83,161)", "auditory":"rgb(0,174,239)","cognitive":"rgb(144,208,180)",
-                 "vestibular":"rgb(239,154,192)","olfactory or gustatory":"rgb(166,117,79)","other":"rgb(147,149,152)",
-                 "somatosensory":"rgb(254,225,15)", "after discharge":"rgb(255,255,255)", "patient in doubt":"rgb(147,149,152)",
-                 "pay attention":"rgb(236,0,140)", "seizure":"rgb(35,31,32)", "recognizable":"rgb(255,0,0)", "not recognizable":"rgb(255,0,0)"}
-    sizes = list(range(5, 5 + 2*len(color_map), 4)) # sizes of the color dots to show multiple categories
-  
-    for stim in stimulations_df.index:
-        if isinstance(stimulations_df["Category"].loc[stim], list): # category annotated
-            elec1 = stimulations_df["Electrode 1"].loc[stim]
-            elec2 = stimulations_df["Electrode 2"].loc[stim]
-
-            topo_elec1 = electrode_coordinates_interpolated.loc[
-                electrode_coordinates_interpolated["Electrode"] == elec1, ["X", "Y", "Z"]]
-            topo_elec2 = electrode_coordinates_interpolated.loc[
-                electrode_coordinates_interpolated["Electrode"] == elec2, ["X", "Y", "Z"]]
-            
-            categories = stimulations_df["Category"].loc[stim] # list
-            size_count = len(categories) - 1
-            
-            # Plot concentric markers for electrodes with multiple categories
-            for cat in categories:
-
-                fig.add_trace(go.Scatter3d(
-                    x=topo_elec1['X'], y=topo_elec1['Y'], z=topo_elec1['Z'],
-                    mode="markers+text",
-                    text=elec1,
-                    marker=dict(
-                        size=sizes[size_count],
-                        color=color_map[cat],
-                        opacity=1.0,
-                        line=dict(width=0)  # remove outline
-                    ),
-                    name=cat,
-                    customdata = [[elec1, cat]],
-                    hovertemplate="%{customdata[0]}<extra>%{customdata[1]}</extra>",
-                    showlegend=False  # avoid duplicate legend entries
-                ))
-                fig.add_trace(go.Scatter3d(
-                    x=topo_elec2['X'], y=topo_elec2['Y'], z=topo_elec2['Z'],
-                    mode="markers+text",
-                    text=elec2,
-                    marker=dict(
-                        size=sizes[size_count],
-                        color=color_map[cat],
-                        opacity=1.0,
-                        line=dict(width=0)  # remove outline
-                    ),
-                    name=cat,
-                    customdata = [[elec2, cat]],
-                    hovertemplate="%{customdata[0]}<extra>%{customdata[1]}</extra>",
-                    showlegend=False  # avoid duplicate legend entries
-                ))
-                size_count -= 1
-                fig.update_layout(hovermode='closest')
+    # Plot concentric markers for electrodes with multiple categories: one marker per stimulated electrode
+    # and category, the first category gets the largest marker (layer len(categories) - 1)
+    annotated = stimulations_df[stimulations_df["Category"].map(lambda categories: isinstance(categories, list))]
+    markers = annotated[["Electrode 1", "Electrode 2", "Category"]].explode("Category")
+    markers["Layer"] = markers.groupby(level=0).cumcount(ascending=False)
+    markers = markers.melt(id_vars=["Category", "Layer"], value_vars=["Electrode 1", "Electrode 2"], value_name="Electrode")
+    
+    # Look up the coordinates via the electrode ID, electrodes without coordinates are not plotted
+    markers[["X", "Y", "Z"]] = registry.coordinates(markers["Electrode"])
+    markers = markers.dropna(subset=["X", "Y", "Z"])
+    
+    # One trace per layer and category, the largest markers are plotted first
+    markers = markers.sort_values("Layer", ascending=False, kind="stable")
+    for (layer, cat), markers_cat in markers.groupby(["Layer", "Category"], sort=False):
+        fig.add_trace(go.Scatter3d(
+            x=markers_cat['X'], y=markers_cat['Y'], z=markers_cat['Z'],
+            mode="markers+text",
+            text=markers_cat['Electrode'],
+            marker=dict(
+                size=np.full(len(markers_cat), 5 + 4*layer), # sizes of the color dots to show multiple categories
+                color=categories_colors[cat],
+                opacity=1.0,
+                line=dict(width=0)  # remove outline
+            ),
+            name=cat,
+            customdata=markers_cat[['Electrode', 'Category']].to_numpy(),
+            hovertemplate="%{customdata[0]}<extra>%{customdata[1]}</extra>",
+            showlegend=False  # avoid duplicate legend entries
+        ))
                     
     return fig
@@ -10,29 +10,33 @@ Input:
         
     stimulations_df: a dataframe with the processed annotations (output from estimapp_process_annotations)
     
+    registry: the electrode registry of electrodes_df (output from estimapp_build_electrode_registry).
+        Default = None, the registry is created from electrodes_df
+    
 Output:
     fig: a plotly figure with the 2D projection of clinical symptom categories on the electrode overview.
 """
 
+import logging
 import numpy as np
-import matplotlib
-matplotlib.use('agg')
 import re
-import plotly.express as px
-import plotly.io as pio
+import plotly.graph_objs as go
 
-from functions.estimapp_open_icon import estimapp_open_icon
+from functions.estimapp_open_icon import estimapp_open_icon, icon_size_px
 from functions.estimapp_merge_stimpairs import estimapp_merge_stimpairs
 from functions.estimapp_rearrange_electrodescheme import estimapp_rearrange_electrodescheme
+from functions.estimapp_electrode_registry import estimapp_build_electrode_registry
 
-pio.renderers.default = 'browser'
+logger = logging.getLogger(__name__)
 
-def estimapp_generate_plot(electrodes_df, stimulations_df):
+def estimapp_generate_plot(electrodes_df, stimulations_df, registry=None):
     #%% Filter unique categories per stimpair and return stimulations_df_merged
     stimulations_df, stimulations_df_merged = estimapp_merge_stimpairs(stimulations_df)
+    if registry is None:
+        registry = estimapp_build_electrode_registry(electrodes_df)
 
     # Create more whitespace in electrodes_df if multiple categories
-    topo, channel = estimapp_rearrange_electrodescheme(stimulations_df_merged, electrodes_df)
+    topo, channel = estimapp_rearrange_electrodescheme(stimulations_df_merged, electrodes_df, registry)
         
     # Get the electrode names
     channel_name = [re.match(r'[A-Za-z]+', ch).group() for ch in channel]
@@ -45,7 +49,8 @@ def estimapp_generate_plot(electrodes_df, stimulations_df):
     channel_indices_01 = [i for i, x in enumerate(channel_number) if x == '01']
     
     #%% Create Plotly figure
-    fig = px.scatter(x=topo['x'], y=topo['y'], width=800, height=1000)
+    fig = go.Figure(go.Scatter(x=topo['x'], y=topo['y'], mode='markers'))
+    fig.update_layout(width=800, height=1000, margin=dict(t=60))
     fig.update_yaxes(autorange="reversed")
     fig.update_yaxes(visible=False, showticklabels=False, scaleanchor='x', scaleratio=1)
     fig.update_xaxes(visible=False, showticklabels=False)
@@ -76,7 +81,7 @@ def estimapp_generate_plot(electrodes_df, stimulations_df):
             topo['direction'][channel_indices_01[p]] = 'TtoB'
     
         else:
-            print("WARNING: channel ", channel[channel_indices_01[p]], " cannot be localized correctly")
+            logger.warning("Channel %s cannot be localized correctly", channel[channel_indices_01[p]])
     del p, topo_px, topo_py
     
     # Add electrode orientation to all electrode contacts in topo dictionary
@@ -96,8 +101,8 @@ def estimapp_generate_plot(electrodes_df, stimulations_df):
   
     # calculate coordinates of icons
     for stim in stimulations_df_merged.index: 
-        topo_idx_elec1 = channel.index(stimulations_df_merged["Electrode 1"][stim]) 
-        topo_idx_elec2 = channel.index(stimulations_df_merged["Electrode 2"][stim]) 
+        topo_idx_elec1 = registry.channel_index(stimulations_df_merged["Electrode 1"][stim]) 
+        topo_idx_elec2 = registry.channel_index(stimulations_df_merged["Electrode 2"][stim]) 
         
         categories = stimulations_df_merged["Category"].loc[stim] # list
         count_per_stim = 0
@@ -121,16 +126,14 @@ def estimapp_generate_plot(electrodes_df, stimulations_df):
                     list_topo_x_icon.append(topo["x"][topo_idx_elec1] - 0 - 1*count_per_stim)
                     list_topo_y_icon.append((topo["y"][topo_idx_elec1] + topo["y"][topo_idx_elec2]) / 2 - 0.5)
             else:
-                print("Stimulated electrodes are in different directions, check if stimulation pair and direction is correct.")
+                logger.warning("Stimulated electrodes are in different directions, check if stimulation pair and direction is correct.")
                             
-            current_icon, _ = estimapp_open_icon(cat) #png
-            list_icons.append(current_icon)
+            list_icons.append(estimapp_open_icon(cat)) # data URI of the png, loaded once
             count_per_stim += 1   
 
-    if 'current_icon' in locals():
-        width, height = current_icon.size
-        scaled_width = width * icon_size
-        scaled_height = height * icon_size              
+    width, height = icon_size_px
+    scaled_width = width * icon_size
+    scaled_height = height * icon_size              
                 
     list_images = []
     
@@ -20,31 +20,38 @@ Output:
     visible_columns: the columns of formatted_df. Default = ['Electrode 1', 'Electrode 2',
             'Category', 'Free text', 'Stim type']
 """
+from ast import literal_eval
 import pandas as pd
 
-def estimapp_generate_table(stimulations_df, sort_by_column="Electrode 1"):
+def estimapp_parse_list(cell):
+    # Parse a stringified list, e.g. "['a', 'b']". literal_eval only accepts Python literals, the text is never executed
+    try:
+        parsed = literal_eval(cell)
+    except Exception:
+        return None
+    return parsed if isinstance(parsed, list) else None
 
-    def format_cell(col, cell):
+def estimapp_generate_table(stimulations_df, sort_by_column="Electrode 1"):
+    visible_columns = [col for col in stimulations_df.columns if col != "AnnotationIndex"]
+    
+    # Format the table per column
+    formatted_columns = {}
+    for col in visible_columns:
+        cells = stimulations_df[col].reset_index(drop=True)
+        formatted = cells.map(str)
+        if col == "Free text" or col == "Category":
+            # Handle list
+            is_list = cells.map(lambda cell: isinstance(cell, list))
+            formatted[is_list] = cells[is_list].map(lambda cell: "; ".join(map(str, cell)))
         if col == "Free text":
-            # Handle list or stringified list
-            if isinstance(cell, list):
-                return "; ".join(map(str, cell))
-            elif isinstance(cell, str) and cell.startswith("[") and cell.endswith("]"):
-                try:
-                    parsed = eval(cell)
-                    if isinstance(parsed, list):
-                        return ", ".join(map(str, parsed))
-                except:
-                    pass  # fallback to raw string
-        if col == "Category":
-            # Handle list or stringified list
-            if isinstance(cell, list):
-                return "; ".join(map(str, cell))
-        return str(cell)
+            # Handle stringified list, other strings are kept
+            is_text = cells.map(lambda cell: isinstance(cell, str))
+            stringified = cells[is_text & formatted.str.startswith("[") & formatted.str.endswith("]")]
+            parsed = stringified.map(estimapp_parse_list).dropna()
+            formatted[parsed.index] = parsed.map(lambda cell: ", ".join(map(str, cell)))
+        formatted_columns[col] = formatted
     
-    visible_columns = [col for col in stimulations_df.columns if col != "AnnotationIndex"]
-    formatted_df = pd.DataFrame([{col: format_cell(col, row[col]) for col in visible_columns}
-        for _, row in stimulations_df.iterrows()])
+    formatted_df = pd.DataFrame(formatted_columns, index=pd.RangeIndex(len(stimulations_df)), columns=visible_columns)
     if sort_by_column in formatted_df.columns:
       formatted_df.sort_values(by=sort_by_column, inplace=True, key=lambda col: col.str.lower() if col.dtype == "object" else col)
 
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17, 2026
+
+@author: iheijink
+
+This module records the wall time, input sizes and peak memory of every decode, process and render
+stage per request, and serves the aggregates on a local metrics endpoint of the app server.
+
+The most recent stage records are kept in the cache folder/metrics (estimapp_cache_dir, requires
+diskcache, otherwise in memory of the worker), so the metrics contain the stages of all workers and
+background jobs.
+
+Every stage records the change of the memory (RSS) of the process during the stage (rss_change_mb).
+If the environment variable ESTIMAPP_TRACE_MEMORY=1 is set (slower), the peak of the memory allocated
+by python during the stage is also recorded (peak_memory_mb, tracemalloc). With concurrent requests the
+memory of a stage also contains the other requests.
+
+Endpoints, only for requests from localhost that are not forwarded by a (reverse) proxy, or for requests
+with the header "Authorization: Bearer <token>" if the environment variable ESTIMAPP_METRICS_TOKEN is set:
+    GET /metrics: the aggregates per stage and the most recent stage records (JSON)
+
+    POST /metrics/profile: profile the next callback request with cProfile. The profile is saved in
+        ESTIMAPP_PROFILE_DIR (default: temporary folder) and GET /metrics/profile returns the file
+        and the slowest functions (cumulative time).
+
+Input:
+    name: the name of the stage, e.g. "process annotations"
+
+    sizes: the input sizes of the stage, e.g. rows=..., pairs=..., faces=... (more sizes can be added
+        to the sizes dictionary inside the stage)
+
+Output:
+    stage_records: the most recent stage records (request, stage, wall time, sizes, memory change and peak memory)
+
+    estimapp_metrics: the aggregates per stage over the stage records (count, total, mean and maximum
+        wall time, maximum memory change and peak memory, sizes of the last run)
+"""
+import contextvars
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from functions.estimapp_session_cache import estimapp_cache_dir
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+current_request = contextvars.ContextVar("estimapp_request", default=None)
+_active_stages = threading.local() # per thread, the peak memory of the running (nested) stages
+
+def estimapp_create_stage_records(max_records=10000):
+    try:
+        import diskcache
+        return diskcache.Deque(directory=os.path.join(estimapp_cache_dir(), "metrics"), maxlen=max_records)
+    except ImportError:
+        logger.warning("diskcache is not installed, the metrics only contain the stages of this worker")
+    return deque(maxlen=max_records)
+
+stage_records = estimapp_create_stage_records()
+
+@contextmanager
+def estimapp_request(request_id=None):
+    # Group the stages outside a server request, e.g. of a background job. Inside a request the request ID is kept
+    token = current_request.set(request_id or current_request.get() or uuid.uuid4().hex[:8])
+    try:
+        yield
+    finally:
+        current_request.reset(token)
+
+def estimapp_rss_mb():
+    # Current memory (RSS) of the process in MB
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss / 1024**2
+
+@contextmanager
+def estimapp_stage(name, **sizes):
+    if os.environ.get("ESTIMAPP_TRACE_MEMORY") == "1" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracing = tracemalloc.is_tracing()
+    stack = _active_stages.__dict__.setdefault("stack", [])
+
+    if tracing:
+        start_memory, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1] = max(stack[-1], peak) # keep the peak of the outer stage before the reset
+        tracemalloc.reset_peak()
+        stack.append(start_memory)
+    start_rss = estimapp_rss_mb()
+    start = time.perf_counter()
+    try:
+        yield sizes
+    finally:
+        wall_time = time.perf_counter() - start
+        if tracing:
+            stage_peak = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1] = max(stack[-1], stage_peak)
+            peak_memory = (stage_peak - start_memory) / 1024**2
+        else:
+            peak_memory = None
+        rss_change = None if start_rss is None else estimapp_rss_mb() - start_rss
+        estimapp_record_stage(name, wall_time, sizes, rss_change, peak_memory)
+
+def estimapp_record_stage(name, wall_time, sizes, rss_change, peak_memory=None):
+    stage_records.append({"request": current_request.get(), "pid": os.getpid(), "stage": name, "wall_time": wall_time,
+                          "sizes": sizes, "rss_change_mb": rss_change, "peak_memory_mb": peak_memory})
+    logger.info("stage %s: %.3f s, sizes %s, memory change %s MB, peak memory %s MB", name, wall_time, sizes,
+                "?" if rss_change is None else f"{rss_change:+.1f}", "?" if peak_memory is None else f"{peak_memory:.1f}")
+
+def estimapp_metrics(recent=50):
+    records = list(stage_records)
+    stages = {}
+    for record in records:
+        aggregate = stages.setdefault(record["stage"], {"count": 0, "total_time": 0.0, "max_time": 0.0, 
+                                                        "max_rss_change_mb": None, "max_peak_memory_mb": None})
+        aggregate["count"] += 1
+        aggregate["total_time"] += record["wall_time"]
+        aggregate["max_time"] = max(aggregate["max_time"], record["wall_time"])
+        for field in ["rss_change_mb", "peak_memory_mb"]:
+            if record.get(field) is not None:
+                aggregate["max_" + field] = record[field] if aggregate["max_" + field] is None else max(aggregate["max_" + field], record[field])
+        aggregate["last_sizes"] = record["sizes"]
+    for aggregate in stages.values():
+        aggregate["mean_time"] = aggregate["total_time"] / aggregate["count"]
+    return {"memory_tracing": tracemalloc.is_tracing(), "records": len(records), "stages": stages, "recent": records[-recent:]}
+
+def estimapp_register_metrics(server):
+    # server: the Flask server of the Dash app (app.server)
+    from flask import request, jsonify, abort, g
+
+    profile_state = {"armed": False, "last": None}
+    profile_lock = threading.Lock()
+
+    def local_only():
+        token = os.environ.get("ESTIMAPP_METRICS_TOKEN")
+        if token:
+            if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+                abort(403)
+            return
+        # Behind a reverse proxy every client is localhost, proxies add the forwarded headers
+        forwarded = "X-Forwarded-For" in request.headers or "Forwarded" in request.headers
+        if forwarded or request.remote_addr not in ("127.0.0.1", "::1", None):
+            abort(403)
+
+    @server.before_request
+    def start_request():
+        g.estimapp_request = current_request.set(uuid.uuid4().hex[:8])
+        if request.path == "/_dash-update-component" and profile_state["armed"]:
+            with profile_lock:
+                profile = profile_state["armed"]
+                profile_state["armed"] = False # only a single request is profiled
+            if profile:
+                g.estimapp_profile = cProfile.Profile()
+                g.estimapp_profile.enable()
+
+    @server.after_request
+    def finish_request(response):
+        profile = g.pop("estimapp_profile", None)
+        if profile is not None:
+            profile.disable()
+            profile_dir = os.environ.get("ESTIMAPP_PROFILE_DIR", tempfile.gettempdir())
+            profile_file = os.path.join(profile_dir, f"estimapp_{current_request.get()}.prof")
+            profile.dump_stats(profile_file)
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(30)
+            profile_state["last"] = {"request": current_request.get(), "file": profile_file, "summary": summary.getvalue()}
+            logger.info("profile of request %s saved in %s", current_request.get(), profile_file)
+        return response
+
+    @server.teardown_request
+    def reset_request(exception=None):
+        token = g.pop("estimapp_request", None)
+        if token is not None:
+            current_request.reset(token)
+
+    @server.route("/metrics")
+    def metrics():
+        local_only()
+        return jsonify(estimapp_metrics(recent=request.args.get("recent", 50, type=int)))
+
+    @server.route("/metrics/profile", methods=["GET", "POST"])
+    def metrics_profile():
+        local_only()
+        if request.method == "POST":
+            profile_state["armed"] = True
+            return jsonify({"armed": True})
+        return jsonify(profile_state["last"] or {"armed": profile_state["armed"]})
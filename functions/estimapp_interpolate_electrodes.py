@@ -13,38 +13,40 @@ Input:
         number of channels, and entry and target coordinates of the implanted electrodes.
         
     electrode_distance: the distance in mm between electrode contacts. For Dixi electrodes
-        the distance is 3.5mm. Default = 3.5
+        the distance is 3.5mm. A dictionary with the distance per electrode model can be given,
+        the electrode model of every electrode is in the column electrode_model of electrode_coordinates
+        (models that are not in the dictionary and electrodes without a model use 3.5mm). Default = 3.5
         
 Output:
-    interpolated_electrodes: a dataframe with the interpolated electrode coordinates
+    interpolated_electrodes: a dataframe with the interpolated electrode coordinates (X, Y, Z),
+        indexed by the electrode name (Electrode)
 """
 
 import pandas as pd
 import numpy as np
 
 def estimapp_interpolate_electrodes(electrode_coordinates, electrode_distance=3.5):
-    results = []
-
-    for _, row in electrode_coordinates.iterrows():
-        name = row['electrode_name']
-        n_channels = int(row['nr_of_channels'])
-        entry = np.array([row['entry_x'], row['entry_y'], row['entry_z']], dtype=float) # highest channel number
-        target = np.array([row['target_x'], row['target_y'], row['target_z']], dtype=float) # channel number 1 (deepest)
-
-        # Generate n_channels points between target and entry
-        vec = entry - target
-        dist = np.linalg.norm(vec)
-        direction = vec / dist
-        
-        for n in range(n_channels):
-            point = target + n * electrode_distance * direction
-            channel_name = f"{name}{n+1:02d}" # combine electrode name and channel number, add 0 for channel 1-9
-            results.append({
-                'Electrode': channel_name,
-                'X': point[0],
-                'Y': point[1],
-                'Z': point[2]
-            })
+    n_channels = electrode_coordinates['nr_of_channels'].astype(int).to_numpy()
+    entry = electrode_coordinates[['entry_x', 'entry_y', 'entry_z']].to_numpy(dtype=float) # highest channel number
+    target = electrode_coordinates[['target_x', 'target_y', 'target_z']].to_numpy(dtype=float) # channel number 1 (deepest)
+    
+    if isinstance(electrode_distance, dict):
+        models = electrode_coordinates.get('electrode_model', pd.Series(index=electrode_coordinates.index, dtype=object))
+        electrode_distance = models.map(electrode_distance).fillna(3.5).to_numpy(dtype=float)
+    distance = np.broadcast_to(np.asarray(electrode_distance, dtype=float), n_channels.shape)
+    
+    # Unit vector from target to entry per electrode
+    vec = entry - target
+    direction = vec / np.linalg.norm(vec, axis=1, keepdims=True)
+    
+    # Generate n_channels points between target and entry for all electrodes at once
+    electrode = np.repeat(np.arange(len(n_channels)), n_channels)
+    contact = np.arange(n_channels.sum()) - np.repeat(np.cumsum(n_channels) - n_channels, n_channels) # 0 to n_channels-1 per electrode
+    points = target[electrode] + (contact * distance[electrode])[:, None] * direction[electrode]
+    
+    # Combine electrode name and channel number, add 0 for channel 1-9
+    names = electrode_coordinates['electrode_name'].astype(str).to_numpy()[electrode] + \
+        pd.Series(contact + 1).astype(str).str.zfill(2).to_numpy()
     
-    interpolated_electrodes = pd.DataFrame(results)
+    interpolated_electrodes = pd.DataFrame(points, columns=['X', 'Y', 'Z'], index=pd.Index(names, name='Electrode'))
     return interpolated_electrodes
\ No newline at end of file
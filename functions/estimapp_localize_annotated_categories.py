@@ -7,21 +7,21 @@ This function localizes the annotated abbreviation of the categories of evoked c
 and shows the indices of the annotation per category
 
 Input: 
-    annotations_df: a dataframe containing all annotations during stimulation
+    annotations_df: a dataframe containing all annotations during stimulation, 
+        classified by estimapp_classify_annotations
     
 Output:
     categories: a dictionary containing all categories of evoked clinical symptoms
 
 """
+from functions.estimapp_category_registry import categories_abbreviations
 
-def estimapp_localize_annotated_categories(annotations_df, column_name):
-    abbreviations = ['mo', 'sm', 'cm', 'la', 'vest', 'auto', 'aff', 'cog', 'sts', 'vis', 'audi', 'og', 'ot', '?', '!', 'sz', 'AD']
-    categories = {}
-
-    for abbr in abbreviations:
-        
-        indices = annotations_df[annotations_df[column_name].fillna('').str.casefold() == abbr.casefold()].index.tolist()
+def estimapp_localize_annotated_categories(annotations_df):
+    categoryRows = annotations_df[annotations_df['AnnotationType'] == 'category']
+    indices_per_category = categoryRows.groupby('AnnotationLabel').groups
 
-        categories[abbr] = indices
+    categories = {}
+    for abbr, category in categories_abbreviations.items():
+        categories[abbr] = indices_per_category[category].tolist() if category in indices_per_category else []
         
     return categories
@@ -12,41 +12,40 @@ Output:
     topo: a dictionary containing the x and y coordinates of the electrodes (length and order equals the number of channels)
     
     channel: a list containing the channel name and number (length and order matches topo dictionary)
+    
+    positions: a dictionary with the (row, column) in electrodes of every channel name
 """
+import logging
 import numpy as np
 import pandas as pd
 
+from functions.estimapp_electrode_registry import estimapp_normalize_electrode_names
+
+logger = logging.getLogger(__name__)
+
 def estimapp_localize_electrode_positions(electrodes):
     topo = {}
-    count = 0
-    x = []
-    y = []
-    channel = []
-    
-    for nRow in range(electrodes.shape[0]):
-        for nCol in range(electrodes.shape[1]):
-            if pd.notna(electrodes.iat[nRow, nCol]):
-                #letter = np.array(list(filter(str.isalpha, electrodes.iat[nRow, nCol])))
-                number = np.array(list(filter(str.isdigit, electrodes.iat[nRow, nCol])))
-                test1 = electrodes.iat[nRow, nCol]
-                test2 = electrodes.iat[nRow, nCol][0:-1] + '0' + electrodes.iat[nRow, nCol][-1:]
-    
-                if len(number) == 2:
-                    channel.append(test1)
-                    y.append(nRow)
-                    x.append(nCol)
-                    count += 1
-                elif len(number) == 1:
-                    channel.append(test2)
-                    y.append(nRow)
-                    x.append(nCol)
-                    count += 1
-                elif len(number) >2:
-                    print(f'Warning: Electrode {test1} or {test2} is not found')
+    
+    # All filled cells in the order of the electrode scheme (row by row)
+    cells = electrodes.to_numpy(dtype=object)
+    y, x = np.nonzero(pd.notna(cells))
+    names = pd.Series(cells[y, x], dtype=object).astype(str)
+    nr_of_digits = names.str.count(r'\d').to_numpy()
+    
+    for name in names[nr_of_digits > 2]:
+        logger.warning('Electrode %s is not found', name)
+    
+    # Cells with 1 or 2 digits are electrode contacts, 2 digits in electrode names (e.g. AR1 to AR01)
+    contacts = (nr_of_digits == 1) | (nr_of_digits == 2)
+    channel = estimapp_normalize_electrode_names(names[contacts]).tolist()
+    x, y = x[contacts], y[contacts]
     
     # Place the locations of the electrodes in the structure
-    topo['x'] = np.array(x)
-    topo['y'] = np.array(y)
+    topo['x'] = x
+    topo['y'] = y
     topo['direction'] = [''] *len(x)
     
-    return topo, channel
\ No newline at end of file
+    # Direct lookup of the position of a channel, the first cell is used if a name appears twice (as channel.index)
+    positions = dict(zip(reversed(channel), zip(y[::-1].tolist(), x[::-1].tolist())))
+    
+    return topo, channel, positions
\ No newline at end of file
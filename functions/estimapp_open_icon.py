@@ -3,26 +3,43 @@
 Created on Tue May 20, 2025
 @author: iheijink
 
-This function opens an icon from the relative path
+This function opens an icon from the relative path. All icons in the icons folder are
+loaded, resized and encoded once, and shared by all figures.
 
 Input:
     cat: the category of clinical symptoms
-    
+
 Output:
-    icon: resized png of the icon of cat
-    icon_array: the icon as a numpy array
+    icon: data URI of the resized png of the icon of cat
+
+    icon_size_px: the width and height of the resized icons in pixels
 """
-from PIL import Image
+from functools import lru_cache
+from types import MappingProxyType
+import io
 import os
 import os.path as op
 import base64
 
-def estimapp_open_icon(cat):
+icon_size_px = (200, 200)
+
+@lru_cache(maxsize=None)
+def estimapp_load_icons():
+    from PIL import Image # only needed for the 2D visualization
     RepoPath = op.abspath(op.join(__file__, op.pardir, op.pardir))
-    icon_folder = os.path.join(RepoPath, 'icons', cat + '.png')
-    
-    icon = Image.open(icon_folder).resize((200,200)) # Open the image and resize
-    
-    with open(icon_folder, 'rb') as f:
-        encoded = base64.b64encode(f.read()).decode()
-    return icon, f"data:image/png;base64,{encoded}"
\ No newline at end of file
+    icon_folder = os.path.join(RepoPath, 'icons')
+
+    icons = {}
+    for file_name in sorted(os.listdir(icon_folder)):
+        cat, extension = op.splitext(file_name)
+        if extension != '.png':
+            continue
+        with Image.open(os.path.join(icon_folder, file_name)) as icon:
+            icon = icon.resize(icon_size_px) # Open the image and resize
+            buffer = io.BytesIO()
+            icon.save(buffer, format='PNG')
+        icons[cat] = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    return MappingProxyType(icons) # read-only, shared by all callbacks
+
+def estimapp_open_icon(cat):
+    return estimapp_load_icons()[cat]
@@ -24,48 +24,36 @@ Output:
     categories: A dictionary with key the abbreviation of the category 
         used in the annotations and value the full name of the category.
 """
-import os
-import pandas as pd
-import sys
-
-current_file = os.path.abspath(__file__)
-scripts_dir = os.path.dirname(current_file)
-python_dir = os.path.abspath(os.path.join(scripts_dir, '..'))
-sys.path.append(python_dir)
+import logging
 
+from functions.estimapp_instrumentation import estimapp_stage
+from functions.estimapp_classify_annotations import estimapp_classify_annotations
 from functions.estimapp_localize_annotated_categories import estimapp_localize_annotated_categories
 from functions.estimapp_define_stimulation_period import estimapp_define_stimulation_period
 from functions.estimapp_create_stimulations_overview import estimapp_create_stimulations_overview
 
+logger = logging.getLogger(__name__)
+
 def estimapp_process_annotations(annotations_df, column_name="Comment"):
-    print("process annotations")    
-    print("define stimulation period")
-    
-    # Define stimulation period
-    stimPeriod = estimapp_define_stimulation_period(annotations_df, column_name)
-    print("remove annotations outside stimulation period")
-    print("stimPeriod", stimPeriod.shape, stimPeriod[column_name])
+    # Classify all annotations and label them with their stimulation period
+    with estimapp_stage("classify annotations", rows=len(annotations_df)):
+        classified_annotations_df = estimapp_classify_annotations(annotations_df, column_name)
+    with estimapp_stage("define stimulation period", rows=len(classified_annotations_df)):
+        labelled_annotations_df = estimapp_define_stimulation_period(classified_annotations_df)
     
     # Remove annotations outside stimulation period
-    filtered_annotations_df = pd.DataFrame()
-    if all(stimPeriod.iloc[::2, ::2][column_name].str.contains("Stim_on")) and len(stimPeriod) %2 == 0: 
-        # Stim_on and off annotations complete
-        for period in range(0,len(stimPeriod.index),2):
-            idx_stimOn = stimPeriod.index[period]
-            idx_stimOff = stimPeriod.index[period + 1]
-            annotations_currentPeriod = annotations_df[idx_stimOn:idx_stimOff+1] 
-            filtered_annotations_df = pd.concat([filtered_annotations_df, annotations_currentPeriod], ignore_index=True)
-    else: 
-        raise ValueError("Stim_on or Stim_off annotation missing, adjust in annotations overview Excel")
-    del idx_stimOn, idx_stimOff, annotations_currentPeriod, period, annotations_df, stimPeriod
+    filtered_annotations_df = labelled_annotations_df[labelled_annotations_df["StimPeriod"] >= 0].reset_index(drop=True)
+    stimPeriod = filtered_annotations_df[filtered_annotations_df["AnnotationType"] == "stim marker"]
+    del classified_annotations_df, labelled_annotations_df, annotations_df
     
-    print("Filtered annotations", type(filtered_annotations_df), filtered_annotations_df.shape)
-    stimPeriod = estimapp_define_stimulation_period(filtered_annotations_df, column_name)
+    logger.debug("%d annotations inside stimulation periods", len(filtered_annotations_df))
          
-    annotated_categories = estimapp_localize_annotated_categories(filtered_annotations_df, column_name)
-    print("Annotated categories are:", annotated_categories)
+    annotated_categories = estimapp_localize_annotated_categories(filtered_annotations_df)
+    logger.debug("annotated categories: %s", annotated_categories)
     
     # Create stimulations_df which contains all stimulations  
-    stimulations_df, filtered_stimulations_df, categories = estimapp_create_stimulations_overview(filtered_annotations_df, annotated_categories, stimPeriod, column_name)
+    with estimapp_stage("create stimulations overview", rows=len(filtered_annotations_df)) as sizes:
+        stimulations_df, filtered_stimulations_df, categories = estimapp_create_stimulations_overview(filtered_annotations_df, annotated_categories, stimPeriod, column_name)
+        sizes["pairs"] = len(stimulations_df)
     
     return stimulations_df, filtered_stimulations_df, categories
\ No newline at end of file
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16, 2026
+
+@author: iheijink
+
+These functions read the decoded input files of EStiMapp. They are used by the app
+and by the batch processing (estimapp_batch.py).
+
+Input:
+    decoded: the bytes of the input file
+
+Output:
+    estimapp_read_excel: a dataframe with the electrodes overview or electrode coordinates.
+        The worksheet is chosen based on the known worksheet names, otherwise the first worksheet is read.
+
+    estimapp_read_annotations: a dataframe with the notes column (column_name, default = 'Comment') of one
+        annotations file (tab-delimited csv), read with the fast C parser. Malformed rows (more fields than
+        the header, because of a tab in the note) are repaired first, the tab is kept in the note.
+        The reader used ("c" or "repaired") is saved in annotations.attrs["reader"].
+
+    estimapp_read_annotation_files: a dataframe with the annotations of all annotation files (decoded_files),
+        read in parallel. The column SourceFile contains the name of the file (file_names) of every annotation,
+        SourceRow the row of the annotation in its file (1-based, without the header), annotations_df.attrs["reader"] contains the parser used per file.
+
+    estimapp_read_ply: the 3D PLY object containing the brain rendering
+"""
+import io
+import csv
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def estimapp_read_excel(decoded):
+    xls = pd.ExcelFile(io.BytesIO(decoded))
+    sheet_names = xls.sheet_names
+    logger.debug("sheet names %s", sheet_names)
+    if len(sheet_names) > 1 and "sjabloon" in sheet_names:
+        sheet_name = "sjabloon"
+    elif len(sheet_names) > 1 and "Sheet 1" in sheet_names:
+        sheet_name = "Sheet 1"
+    elif len(sheet_names) > 1 and "Sheet1" in sheet_names:
+        sheet_name = "Sheet1"
+    elif len(sheet_names) > 1 and "elektroden" in sheet_names:
+        sheet_name = "elektroden"
+    elif len(sheet_names) > 1 and "Elektroden" in sheet_names:
+        sheet_name = "Elektroden"
+    else:
+        sheet_name = 0 # Default to read first worksheet of excel file
+    decoded_excel = pd.read_excel(xls, sheet_name=sheet_name, keep_default_na=False)
+    return decoded_excel
+
+def estimapp_count_fields(decoded):
+    # Number of tab-delimited fields of the header and the maximum number of fields of all rows
+    data = np.frombuffer(decoded, dtype=np.uint8)
+    tabs = np.flatnonzero(data == ord("\t"))
+    newlines = np.flatnonzero(data == ord("\n"))
+    tabs_per_row = np.bincount(np.searchsorted(newlines, tabs), minlength=1)
+    return tabs_per_row[0] + 1, tabs_per_row.max() + 1
+
+note_tab = b"\x1f" # placeholder of a tab in a note (ASCII unit separator)
+
+def estimapp_read_annotations(decoded, column_name="Comment"):
+    read_options = dict(
+        encoding="latin1",            # handles special characters like °, é, etc.
+        sep="\t",                     # tab-delimited
+        quoting=csv.QUOTE_NONE        # <-- ignore quotes completely
+    )
+    nr_of_columns, max_nr_of_fields = estimapp_count_fields(decoded)
+    try:
+        if max_nr_of_fields > nr_of_columns:
+            raise pd.errors.ParserError(f"Expected {nr_of_columns} fields, saw {max_nr_of_fields}")
+        # Only the column with the notes is used by estimapp_process_annotations
+        annotations = pd.read_csv(io.BytesIO(decoded), engine="c", usecols=lambda column: column == column_name, **read_options) # fast parser
+        reader = "c"
+    except pd.errors.ParserError as e:
+        logger.info("Fast annotations reader failed, repair malformed rows: %s", e)
+        # Malformed rows have a tab in the note (last column). The tabs in the note are replaced by a
+        # placeholder before parsing and restored after, so every row (also the first) keeps all its columns
+        rows = decoded.split(b"\n")
+        for i, row in enumerate(rows):
+            if row.count(b"\t") >= nr_of_columns:
+                fields = row.split(b"\t", nr_of_columns - 1)
+                rows[i] = b"\t".join(fields[:-1] + [fields[-1].replace(b"\t", note_tab)])
+        annotations = pd.read_csv(io.BytesIO(b"\n".join(rows)), engine="c", usecols=lambda column: column == column_name, **read_options)
+        if column_name in annotations.columns:
+            annotations[column_name] = annotations[column_name].str.replace(note_tab.decode(read_options["encoding"]), "\t", regex=False)
+        reader = "repaired"
+
+    annotations.attrs["reader"] = reader # parser used for this file
+    return annotations
+
+def estimapp_read_annotation_files(decoded_files, file_names, column_name="Comment", max_workers=None):
+    # Read all annotation files at the same time and concatenate them once
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        annotations = list(executor.map(lambda decoded: estimapp_read_annotations(decoded, column_name), decoded_files))
+
+    readers = {}
+    for file_name, file_annotations in zip(file_names, annotations):
+        file_annotations["SourceFile"] = file_name # provenance of every annotation
+        file_annotations["SourceRow"] = np.arange(1, len(file_annotations) + 1)
+        readers[file_name] = file_annotations.attrs["reader"]
+    annotations_df = pd.concat(annotations, ignore_index=True)
+    annotations_df.attrs["reader"] = readers
+    return annotations_df
+
+def estimapp_read_ply(decoded):
+    import trimesh # only needed for the 3D visualization
+    mesh = trimesh.load(io.BytesIO(decoded), file_type='ply')
+    return mesh
@@ -12,6 +12,9 @@ Input:
     
     electrodes_df: a dataframe with the 2D configuration of patient specific electrodes.
     
+    registry: the electrode registry of electrodes_df (output from estimapp_build_electrode_registry).
+        Default = None, the registry is created from electrodes_df
+    
 Output:
     topo: a dictionary containing the x and y coordinates of the electrodes (length and order equals the number of channels)
         with extra white space if multiple categories are present at one stimpair.
@@ -19,13 +22,29 @@ Output:
     channel: a list containing the channel name and number (length and order matches topo dictionary)
 """
 import numpy as np
-import pandas as pd
 
 from functions.estimapp_localize_electrode_positions import estimapp_localize_electrode_positions
+from functions.estimapp_electrode_registry import EstimappElectrodeRegistry
 
-def estimapp_rearrange_electrodescheme(stimulations_df, electrodes_df):
+def estimapp_rearrange_electrodescheme(stimulations_df, electrodes_df, registry=None):
     # Localize electrodes in grid
-    topo, channel = estimapp_localize_electrode_positions(electrodes_df)
+    topo, channel, _ = estimapp_localize_electrode_positions(electrodes_df)
+    if registry is None:
+        registry = EstimappElectrodeRegistry()
+        registry.add_channels(channel, topo)
+    
+    # Extra lines are planned as offsets of the original rows and columns: offsets_x[c] is the number of
+    # inserted columns before original column c. Inserted lines are empty, so the order of the channels does not change
+    x, y = topo['x'].astype(int), topo['y'].astype(int)
+    offsets_x = np.zeros(electrodes_df.shape[1] + 1, dtype=int)
+    offsets_y = np.zeros(electrodes_df.shape[0] + 1, dtype=int)
+    occupied_x = electrodes_df.notna().any(axis=0).to_numpy()
+    occupied_y = electrodes_df.notna().any(axis=1).to_numpy()
+    
+    def is_occupied(line, offsets, occupied):
+        # Check if the line (in the rearranged grid) is an original line that contains any cell
+        original = np.flatnonzero(np.arange(len(occupied)) + offsets[:-1] == line)
+        return len(original) > 0 and occupied[original[0]]
     
     nr_of_categories = stimulations_df['Category'].str.len()
     idx_multiple_categories = nr_of_categories[nr_of_categories > 2].index
@@ -33,22 +52,21 @@ def estimapp_rearrange_electrodescheme(stimulations_df, electrodes_df):
         elec1 = stimulations_df["Electrode 1"].loc[idx]
         elec2 = stimulations_df["Electrode 2"].loc[idx]
         
-        idx_channel1 = channel.index(elec1)
-        idx_channel2 = channel.index(elec2)
+        idx_channel1 = registry.channel_index(elec1)
+        idx_channel2 = registry.channel_index(elec2)
+        x1, x2 = x[idx_channel1] + offsets_x[x[idx_channel1]], x[idx_channel2] + offsets_x[x[idx_channel2]]
+        y1, y2 = y[idx_channel1] + offsets_y[y[idx_channel1]], y[idx_channel2] + offsets_y[y[idx_channel2]]
         
         nr_of_extra_lines = nr_of_categories[idx] - 2
-        check_column_x = topo['x'][idx_channel1] - nr_of_extra_lines
-        check_row_y = topo['y'][idx_channel1] - nr_of_extra_lines 
-        if topo['x'][idx_channel1] == topo['x'][idx_channel2] and check_column_x >= 0 and electrodes_df.loc[check_column_x].notna().any():
-            nan_columns = pd.DataFrame(np.nan, index=electrodes_df.index, columns=[f"nan_col_{i}" for i in range(nr_of_extra_lines)])
-            pos = topo['x'][idx_channel1]
-            electrodes_df = pd.concat([electrodes_df.iloc[:,:pos], nan_columns, electrodes_df.iloc[:,pos:]], axis=1)
-            topo, channel = estimapp_localize_electrode_positions(electrodes_df) # update location of electrodes (topo and channel)()
+        check_column_x = x1 - nr_of_extra_lines
+        check_row_y = y1 - nr_of_extra_lines 
+        if x1 == x2 and check_column_x >= 0 and is_occupied(check_column_x, offsets_x, occupied_x):
+            offsets_x[x[idx_channel1]:] += nr_of_extra_lines # extra columns before the column of elec1
       
-        elif topo['y'][idx_channel1] == topo['y'][idx_channel2] and check_row_y >=0 and electrodes_df.loc[check_row_y].notna().any():
-            nan_rows = pd.DataFrame(np.nan, index=range(nr_of_extra_lines), columns=electrodes_df.columns)
-            pos = topo['y'][idx_channel1]
-            electrodes_df = pd.concat([electrodes_df.iloc[:pos], nan_rows, electrodes_df.iloc[pos:]]).reset_index(drop=True)
-            topo, channel = estimapp_localize_electrode_positions(electrodes_df) # update location of electrodes (topo and channel)
-            
-    return topo, channel
\ No newline at end of file
+        elif y1 == y2 and check_row_y >= 0 and is_occupied(check_row_y, offsets_y, occupied_y):
+            offsets_y[y[idx_channel1]:] += nr_of_extra_lines # extra rows before the row of elec1
+    
+    # Apply the offsets to the positions of all electrodes at once
+    topo['x'] = x + offsets_x[x]
+    topo['y'] = y + offsets_y[y]
+    return topo, channel
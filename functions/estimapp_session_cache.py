@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16, 2026
+
+@author: iheijink
+
+This module keeps the decoded uploads and the processed annotations of a session in
+server memory, so switching between the 2D and 3D tab does not decode and process
+the same uploads again. Entries are keyed by a hash of the uploaded content and
+the least recently used entries are evicted when the cache is full, i.e. when it has more than
+max_entries entries or the approximate size of the entries is more than max_bytes.
+
+The caches are also kept on disk in the folder ESTIMAPP_CACHE_DIR (environment variable, default: the
+folder estimapp-<user id> in the temporary folder), so all workers of a server share the sessions and
+background jobs (requires the optional package diskcache, otherwise the caches are only kept in memory). The size of every disk cache is limited by ESTIMAPP_CACHE_SIZE (bytes, default 4 GB).
+Entries larger than max_entry_bytes (default 64 MB, e.g. a raw PLY or full resolution mesh) are then
+only kept on disk, so every worker only keeps the small entries in memory.
+
+Input:
+    max_entries: the maximum number of entries kept in the cache (in memory). Default = 32
+
+    max_bytes: the maximum approximate size in bytes of the entries kept in memory. Default = 1 GB
+
+    name: the name of the cache, the disk cache is saved in the cache folder/name
+
+    contents: the uploaded contents (str or bytes) used to compute the content hash
+
+Output:
+    session_cache: the cache shared by all callbacks and workers of the app (output from estimapp_create_cache)
+
+    estimapp_cache_dir: the folder of the disk caches
+
+    estimapp_content_hash: a sha256 hex digest of all contents
+
+    estimapp_approximate_size: the approximate size in bytes of a cached value
+
+    estimapp_create_background_manager: a Dash DiskcacheManager for background callbacks, saved in
+        the cache folder/jobs. None if dash[diskcache] is not installed: background jobs run in another
+        process and can only share the session with the server through the disk cache.
+"""
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+def estimapp_approximate_size(value):
+    # Approximate memory size of the cached values: uploads (bytes), dataframes, meshes, figures and tuples of them
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if hasattr(value, "vertices") and hasattr(value, "faces"): # trimesh mesh
+        return value.vertices.nbytes + value.faces.nbytes
+    if hasattr(value, "data") and hasattr(value, "layout"): # plotly figure, the large arrays are in the traces
+        size = estimapp_approximate_size(value.layout.to_plotly_json())
+        for trace in value.data:
+            for name in trace:
+                prop = trace[name]
+                if not hasattr(prop, "to_plotly_json"): # nested properties (e.g. lighting) are small
+                    size += estimapp_approximate_size(prop)
+        return size
+    if isinstance(value, dict):
+        return sum(estimapp_approximate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimapp_approximate_size(item) for item in value)
+    if hasattr(value, "__dict__"): # e.g. the electrode registry
+        return estimapp_approximate_size(vars(value))
+    return sys.getsizeof(value)
+
+class EstimappCache:
+    def __init__(self, max_entries=32, max_bytes=1024**3):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key) # mark as most recently used
+            return self._entries[key]
+
+    @property
+    def nbytes(self):
+        # Approximate size of the entries in memory
+        with self._lock:
+            return self._nbytes
+
+    def set(self, key, value):
+        self._set_in_memory(key, value, estimapp_approximate_size(value))
+
+    def _set_in_memory(self, key, value, size):
+        with self._lock:
+            self._nbytes += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._entries.move_to_end(key)
+            # Evict least recently used, the newest entry is kept even if it is larger than max_bytes
+            while len(self._entries) > self.max_entries or (self._nbytes > self.max_bytes and len(self._entries) > 1):
+                evicted, _ = self._entries.popitem(last=False)
+                self._nbytes -= self._sizes.pop(evicted)
+
+    def get_or_compute(self, key, compute):
+        # Only the first call for a key pays for compute(), later calls return the cached value
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+class EstimappDiskCache(EstimappCache):
+    # Entries never change (keys are content hashes or session ids), so recently used entries are
+    # also kept in memory and only entries computed by another worker are read from disk.
+    # Entries larger than max_entry_bytes (e.g. a full resolution mesh) are only kept on disk
+    def __init__(self, directory, max_entries=32, max_bytes=1024**3, size_limit=None, max_entry_bytes=64 * 1024**2):
+        super().__init__(max_entries, max_bytes)
+        self.max_entry_bytes = max_entry_bytes
+        import diskcache # optional, only needed for the disk cache
+        if size_limit is None:
+            size_limit = int(os.environ.get("ESTIMAPP_CACHE_SIZE", 4 * 1024**3))
+        self._disk = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+
+    def __contains__(self, key):
+        return super().__contains__(key) or key in self._disk
+
+    def __len__(self):
+        return len(self._disk)
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is _MISSING:
+            value = self._disk.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self._set_in_memory(key, value, estimapp_approximate_size(value))
+        return value
+
+    def _set_in_memory(self, key, value, size):
+        if size <= self.max_entry_bytes:
+            super()._set_in_memory(key, value, size)
+
+    def set(self, key, value):
+        super().set(key, value)
+        self._disk.set(key, value)
+
+    def clear(self):
+        super().clear()
+        self._disk.clear()
+
+def estimapp_cache_dir():
+    # The same folder for all workers of the app, per user of the temporary folder
+    cache_dir = os.environ.get("ESTIMAPP_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "")
+    return os.path.join(tempfile.gettempdir(), f"estimapp-{user}")
+
+def estimapp_create_cache(name, max_entries=32, max_bytes=1024**3):
+    try:
+        return EstimappDiskCache(os.path.join(estimapp_cache_dir(), name), max_entries, max_bytes)
+    except ImportError:
+        logger.warning("diskcache is not installed, the %s cache is only kept in memory of this worker", name)
+    return EstimappCache(max_entries, max_bytes)
+
+def estimapp_create_background_manager():
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        return DiskcacheManager(diskcache.Cache(os.path.join(estimapp_cache_dir(), "jobs")))
+    except ImportError:
+        logger.warning("dash[diskcache] is not installed, the result is processed in the server thread")
+        return None
+
+def estimapp_content_hash(*contents):
+    content_hash = hashlib.sha256()
+    for content in contents:
+        if content is None:
+            content = b""
+        elif isinstance(content, str):
+            content = content.encode()
+        # Prefix the length so ("ab", "c") and ("a", "bc") do not collide
+        content_hash.update(len(content).to_bytes(8, "little"))
+        content_hash.update(content)
+    return content_hash.hexdigest()
+
+session_cache = estimapp_create_cache("session")
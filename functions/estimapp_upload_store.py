@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16, 2026
+
+@author: iheijink
+
+This module keeps the decoded uploads of a session on the server. The session-data
+store in the browser only holds an opaque session handle, so the uploaded files are
+not sent from the browser to the server on every callback.
+
+Input:
+    electrodes: the base64 encoded contents of the electrodes overview (xlsx)
+
+    annotations: a list with the base64 encoded contents of the annotation files (csv)
+
+    coordinates: the base64 encoded contents of the electrode coordinates (xlsx). Default = None
+
+    ply: the base64 encoded contents of the PLY brain rendering. Default = None
+
+    annotation_names: a list with the file names of the annotation files. Default = None
+
+Output:
+    session_id, hashes: the handle of the stored uploads and the content hashes of the uploads (output from
+        estimapp_store_uploads), both saved in the session-data store. With the hashes the cached results
+        are found without reading the uploads
+
+    stored: True if the uploads of the session are still stored (output from estimapp_has_uploads)
+
+    uploads: a dictionary with the decoded bytes of the uploads and their content hashes
+        (output from estimapp_load_uploads), None if the session is unknown or evicted
+"""
+import base64
+import uuid
+
+from functions.estimapp_session_cache import estimapp_create_cache, estimapp_content_hash
+
+upload_store = estimapp_create_cache("uploads", max_entries=16, max_bytes=512 * 1024**2) # a PLY can be 150 MB
+
+def estimapp_decode_upload(content):
+    # dcc.Upload contents look like "data:<mime type>;base64,<data>"
+    _, content_string = content.split(',')
+    return base64.b64decode(content_string)
+
+def estimapp_store_uploads(electrodes, annotations, coordinates=None, ply=None, annotation_names=None):
+    electrodes = estimapp_decode_upload(electrodes)
+    annotations = [estimapp_decode_upload(file) for file in annotations]
+    coordinates = estimapp_decode_upload(coordinates) if coordinates else None
+    ply = estimapp_decode_upload(ply) if ply else None
+    annotation_names = annotation_names or [f"annotations {i + 1}" for i in range(len(annotations))]
+
+    uploads = {
+        "electrodes": electrodes,
+        "annotations": annotations,
+        "annotation_names": annotation_names,
+        "coordinates": coordinates,
+        "ply": ply,
+        # Hashes are computed once here and used as keys for the session cache
+        "hashes": {
+            "electrodes": estimapp_content_hash(electrodes),
+            "annotations": estimapp_content_hash(*annotations, *annotation_names),
+            "coordinates": estimapp_content_hash(coordinates) if coordinates else None,
+            "ply": estimapp_content_hash(ply) if ply else None}
+    }
+
+    session_id = uuid.uuid4().hex
+    upload_store.set(session_id, uploads)
+    return session_id, uploads["hashes"]
+
+def estimapp_has_uploads(session_id):
+    # Does not read the uploads (from disk)
+    return bool(session_id) and session_id in upload_store
+
+def estimapp_load_uploads(session_id):
+    if not session_id:
+        return None
+    return upload_store.get(session_id)